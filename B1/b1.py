@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import sys
+from array import array
+from bisect import bisect_right
 from collections import deque
+from itertools import accumulate, chain, filterfalse, repeat
+from operator import add, getitem, indexOf
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
@@ -11,9 +16,13 @@ if str(ROOT_DIR) not in sys.path:
 
 from shared.automaton_common import (
     format_witness,
-    parse_transitions,
-    read_json_input,
+    iter_transitions,
+    normalize_symbol,
 )
+from shared.compiled import CompiledAutomaton, compile_automaton, compile_from_dict
+from shared.binary import load_input
+from shared.instrument import Profile, phase, print_stats
+from shared.words import iter_words, print_words
 
 def find_witness(
     states: Iterable[Any],
@@ -22,42 +31,401 @@ def find_witness(
     finals: Iterable[Any],
     delta: Any,
 ) -> Optional[str]:
-    _ = list(states)
-    _ = list(alphabet)
-    I = set(initials)
-    F = set(finals)
-    transitions = parse_transitions(delta)
+    automaton = compile_automaton(states, alphabet, initials, finals, delta)
+    return find_witness_compiled(automaton)
 
-    if I & F:
+
+def find_witness_compiled(
+    automaton: CompiledAutomaton, stats: Optional[Dict[str, int]] = None
+) -> Optional[str]:
+    n = automaton.num_states
+    finals = automaton.finals
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    eps_ptr, eps_dst = automaton.eps_ptr, automaton.eps_dst
+    I = automaton.initials
+
+    if any(finals[q] for q in I):
+        return ""
+
+    queue: deque[int] = deque(I)
+    visited = bytearray(n)
+    for q in I:
+        visited[q] = 1
+    # pred_state[q] = -1 marks a BFS root; pred_sym[q] = -1 marks an ε-edge.
+    pred_state = array("i", [-1]) * n
+    pred_sym = array("i", [-1]) * n
+
+    def reconstruct(end: int) -> str:
+        symbol_ids: List[int] = []
+        cur = end
+        while pred_state[cur] != -1:
+            symbol_ids.append(pred_sym[cur])
+            cur = pred_state[cur]
+        symbol_ids.reverse()
+        return automaton.word(symbol_ids)
+
+    try:
+        while queue:
+            p = queue.popleft()
+            for i in range(eps_ptr[p], eps_ptr[p + 1]):
+                q = eps_dst[i]
+                if visited[q]:
+                    continue
+                visited[q] = 1
+                pred_state[q] = p
+                if finals[q]:
+                    return reconstruct(q)
+                queue.append(q)
+            for i in range(sym_ptr[p], sym_ptr[p + 1]):
+                q = sym_dst[i]
+                if visited[q]:
+                    continue
+                visited[q] = 1
+                pred_state[q] = p
+                pred_sym[q] = edge_sym[i]
+                if finals[q]:
+                    return reconstruct(q)
+                queue.append(q)
+        return None
+    finally:
+        if stats is not None:
+            # Every visited state holds one predecessor entry (roots: -1).
+            stats["visited"] = stats["pred"] = visited.count(1)
+
+def iter_witnesses(
+    automaton: CompiledAutomaton, stats: Optional[Dict[str, int]] = None
+) -> Iterator[str]:
+    """
+    Every accepted word, shortest first and without duplicates (see
+    shared.words); the first one is as long as find_witness_compiled's.
+    """
+    return iter_words(automaton, stats)
+
+
+def find_witness_bidirectional(
+    automaton: CompiledAutomaton, stats: Optional[Dict[str, int]] = None
+) -> Optional[str]:
+    """
+    Bidirectional BFS: a forward frontier grows from I over the CSR rows, a
+    backward frontier from F over the reverse index (automaton.reverse()).
+    Each round expands one full level of the smaller frontier; once the two
+    searches meet, the level is finished and the meeting state with the
+    fewest edges overall is used, so the witness has the same (minimal)
+    number of edges as in find_witness_compiled. It may be a different word
+    of that length. Same contract: "" for ε, a word, or None for ⊥.
+    """
+    n = automaton.num_states
+    finals = automaton.finals
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    eps_ptr, eps_dst = automaton.eps_ptr, automaton.eps_dst
+    I = automaton.initials
+
+    if any(finals[q] for q in I):
+        if stats is not None:
+            stats["visited"] = stats["pred"] = 0
+        return ""
+    rev_ptr, rev_src, rev_sym = automaton.reverse()
+
+    # dist_* = -1 marks undiscovered states. link_*[q] is the neighbour of q
+    # towards I (forward) or towards F (backward); sym_* the symbol id of
+    # that edge (-1 for ε).
+    dist_f = array("i", [-1]) * n
+    dist_b = array("i", [-1]) * n
+    link_f = array("i", [-1]) * n
+    link_b = array("i", [-1]) * n
+    sym_f = array("i", [-1]) * n
+    sym_b = array("i", [-1]) * n
+    frontier_f: List[int] = []
+    for q in I:
+        if dist_f[q] < 0:
+            dist_f[q] = 0
+            frontier_f.append(q)
+    frontier_b = [q for q in range(n) if finals[q]]
+    for q in frontier_b:
+        dist_b[q] = 0
+
+    def reconstruct(meet: int) -> str:
+        symbol_ids: List[int] = []
+        cur = meet
+        while link_f[cur] != -1:
+            symbol_ids.append(sym_f[cur])
+            cur = link_f[cur]
+        symbol_ids.reverse()
+        cur = meet
+        while link_b[cur] != -1:
+            symbol_ids.append(sym_b[cur])
+            cur = link_b[cur]
+        return automaton.word(symbol_ids)
+
+    def expand_forward(frontier: List[int]) -> Tuple[List[int], int]:
+        nxt: List[int] = []
+        best, meet = -1, -1
+        for p in frontier:
+            d = dist_f[p] + 1
+            for lo, hi, dst, syms in (
+                (eps_ptr[p], eps_ptr[p + 1], eps_dst, None),
+                (sym_ptr[p], sym_ptr[p + 1], sym_dst, edge_sym),
+            ):
+                for i in range(lo, hi):
+                    q = dst[i]
+                    if dist_f[q] >= 0:
+                        continue
+                    dist_f[q] = d
+                    link_f[q] = p
+                    if syms is not None:
+                        sym_f[q] = syms[i]
+                    if dist_b[q] >= 0:
+                        if best < 0 or d + dist_b[q] < best:
+                            best, meet = d + dist_b[q], q
+                    nxt.append(q)
+        return nxt, meet
+
+    def expand_backward(frontier: List[int]) -> Tuple[List[int], int]:
+        nxt: List[int] = []
+        best, meet = -1, -1
+        for q in frontier:
+            d = dist_b[q] + 1
+            for i in range(rev_ptr[q], rev_ptr[q + 1]):
+                p = rev_src[i]
+                if dist_b[p] >= 0:
+                    continue
+                dist_b[p] = d
+                link_b[p] = q
+                sym_b[p] = rev_sym[i]
+                if dist_f[p] >= 0:
+                    if best < 0 or d + dist_f[p] < best:
+                        best, meet = d + dist_f[p], p
+                nxt.append(p)
+        return nxt, meet
+
+    try:
+        while frontier_f and frontier_b:
+            if len(frontier_f) <= len(frontier_b):
+                frontier_f, meet = expand_forward(frontier_f)
+            else:
+                frontier_b, meet = expand_backward(frontier_b)
+            if meet >= 0:
+                return reconstruct(meet)
+        return None
+    finally:
+        if stats is not None:
+            stats["visited"] = n - dist_f.count(-1)
+            stats["visited_backward"] = n - dist_b.count(-1)
+            # One link per state discovered in either direction.
+            stats["pred"] = stats["visited"] + stats["visited_backward"]
+
+
+def find_witness_levels(
+    automaton: CompiledAutomaton, stats: Optional[Dict[str, int]] = None
+) -> Optional[str]:
+    """
+    Level-synchronous BFS. Each level is expanded in bulk: the CSR rows of
+    the whole frontier are sliced, chained, filtered against the visited
+    bytearray and deduplicated in discovery order, all inside C-level
+    iterators, so there is no Python work per edge. Only the frontier of
+    every level is kept; the witness is rebuilt afterwards by finding the
+    first edge into the current state in the previous level's edge stream.
+    That is exactly the predecessor the queue BFS records, so the witness is
+    identical to find_witness_compiled.
+    """
+    n = automaton.num_states
+    finals = automaton.finals
+    I = automaton.initials
+
+    if any(finals[q] for q in I):
+        if stats is not None:
+            stats["visited"] = stats["pred"] = len(set(I))
         return ""
+    row_ptr, eps_ptr = automaton.sym_ptr, automaton.eps_ptr
+    sym_dst, edge_sym, eps_dst = automaton.sym_dst, automaton.edge_sym, automaton.eps_dst
+    visited = bytearray(n)
+    frontier = list(dict.fromkeys(I))
+    for q in frontier:
+        visited[q] = 1
+    levels: List[List[int]] = [frontier]
+
+    def rows(ptr: Sequence[int], dst: Sequence[int], states: List[int]) -> Iterable[Sequence[int]]:
+        # dst[ptr[q]:ptr[q + 1]] for every q, sliced in C.
+        ptr_at = ptr.__getitem__
+        bounds = map(slice, map(ptr_at, states), map(ptr_at, map((1).__add__, states)))
+        return map(getitem, repeat(dst), bounds)
+
+    def targets(states: List[int]) -> Iterable[int]:
+        # Per state: its ε-targets, then its symbol targets (queue BFS order).
+        if not len(eps_dst):
+            return chain.from_iterable(rows(row_ptr, sym_dst, states))
+        return chain.from_iterable(
+            chain.from_iterable(
+                zip(rows(eps_ptr, eps_dst, states), rows(row_ptr, sym_dst, states))
+            )
+        )
+
+    def reconstruct(end: int) -> str:
+        symbol_ids: List[int] = []
+        cur = end
+        for level in reversed(levels[:-1]):
+            # The first edge into cur in the previous level's target stream is
+            # the one the queue BFS took; locate its source by row lengths.
+            pos = indexOf(targets(level), cur)
+            ends = list(
+                accumulate(
+                    map(
+                        add,
+                        map(len, rows(eps_ptr, eps_dst, level)),
+                        map(len, rows(row_ptr, sym_dst, level)),
+                    )
+                )
+            )
+            i = bisect_right(ends, pos)
+            p = level[i]
+            offset = pos - (ends[i - 1] if i else 0) - (eps_ptr[p + 1] - eps_ptr[p])
+            symbol_ids.append(edge_sym[row_ptr[p] + offset] if offset >= 0 else -1)
+            cur = p
+        symbol_ids.reverse()
+        return automaton.word(symbol_ids)
+
+    try:
+        while frontier:
+            fresh = filterfalse(visited.__getitem__, targets(frontier))
+            frontier = list(dict.fromkeys(fresh))
+            for q in frontier:
+                visited[q] = 1
+            levels.append(frontier)
+            end = next(filter(finals.__getitem__, frontier), None)
+            if end is not None:
+                return reconstruct(end)
+        return None
+    finally:
+        if stats is not None:
+            stats["visited"] = visited.count(1)
+            stats["levels"] = len(levels)
+            # Predecessors are recomputed from the stored level frontiers.
+            stats["pred"] = sum(map(len, levels))
+
+
+class IncrementalEmptiness:
+    """
+    Emptiness of a growing (ε-)NFA, kept up to date under insertions.
+
+    Maintains the BFS distance (in edges, ε included) and a predecessor
+    link for every reachable state, plus the reachable final state with
+    the smallest distance. Insertions only ever shorten distances, so
+    add_transition / add_initial relax and propagate from the newly
+    connected region only; nothing is recomputed from scratch. witness()
+    follows the predecessor links, i.e. costs O(witness length), and
+    returns a shortest witness in the same contract as find_witness.
+    """
+
+    def __init__(
+        self,
+        states: Iterable[Any] = (),
+        alphabet: Iterable[Any] = (),
+        initials: Iterable[Any] = (),
+        finals: Iterable[Any] = (),
+        delta: Any = (),
+    ) -> None:
+        self._ids: Dict[Any, int] = {}
+        self._labels: List[Any] = []
+        # succ[p] lists (symbol, q) with symbol None for ε.
+        self._succ: List[List[Tuple[Optional[str], int]]] = []
+        self._final = bytearray()
+        # dist[q] = -1 while q is unreachable.
+        self._dist = array("i")
+        self._pred = array("i")
+        self._pred_sym: List[Optional[str]] = []
+        self._best = -1
+        # Number of distance updates performed so far (work measure).
+        self.relaxations = 0
+        self.alphabet = [a for a in map(normalize_symbol, alphabet) if a is not None]
+
+        for q in states:
+            self.add_state(q)
+        for p, a, q in iter_transitions(delta):
+            self.add_transition(p, a, q)
+        for q in finals:
+            self.add_final(q)
+        # Initials last: one propagation covers everything added so far.
+        for q in initials:
+            self.add_initial(q)
+
+    def add_state(self, label: Any) -> int:
+        sid = self._ids.get(label)
+        if sid is None:
+            sid = len(self._labels)
+            self._ids[label] = sid
+            self._labels.append(label)
+            self._succ.append([])
+            self._final.append(0)
+            self._dist.append(-1)
+            self._pred.append(-1)
+            self._pred_sym.append(None)
+        return sid
+
+    def add_transition(self, p: Any, sym: Any, q: Any) -> None:
+        pid, qid = self.add_state(p), self.add_state(q)
+        sym = normalize_symbol(sym)
+        self._succ[pid].append((sym, qid))
+        d = self._dist[pid]
+        if d >= 0 and (self._dist[qid] < 0 or d + 1 < self._dist[qid]):
+            self._relax(qid, d + 1, pid, sym)
+
+    def add_initial(self, q: Any) -> None:
+        qid = self.add_state(q)
+        if self._dist[qid] != 0:
+            self._relax(qid, 0, -1, None)
+
+    def add_final(self, q: Any) -> None:
+        qid = self.add_state(q)
+        self._final[qid] = 1
+        self._consider(qid)
+
+    def _consider(self, q: int) -> None:
+        d = self._dist[q]
+        if self._final[q] and d >= 0 and (self._best < 0 or d < self._dist[self._best]):
+            self._best = q
+
+    def _relax(self, q: int, d: int, pred: int, sym: Optional[str]) -> None:
+        """Lower dist[q] to d and propagate breadth-first from q."""
+        dist, preds, pred_sym, succ = self._dist, self._pred, self._pred_sym, self._succ
+        dist[q] = d
+        preds[q] = pred
+        pred_sym[q] = sym
+        self.relaxations += 1
+        self._consider(q)
+        queue: deque[int] = deque([q])
+        while queue:
+            p = queue.popleft()
+            nd = dist[p] + 1
+            for a, r in succ[p]:
+                if dist[r] < 0 or nd < dist[r]:
+                    dist[r] = nd
+                    preds[r] = p
+                    pred_sym[r] = a
+                    self.relaxations += 1
+                    self._consider(r)
+                    queue.append(r)
+
+    def is_empty(self) -> bool:
+        return self._best < 0
+
+    def is_reachable(self, q: Any) -> bool:
+        sid = self._ids.get(q)
+        return sid is not None and self._dist[sid] >= 0
+
+    def witness(self) -> Optional[str]:
+        """A shortest accepted word ("" for ε), or None if the language is empty."""
+        if self._best < 0:
+            return None
+        symbols: List[str] = []
+        cur = self._best
+        while self._pred[cur] != -1:
+            sym = self._pred_sym[cur]
+            if sym is not None:
+                symbols.append(sym)
+            cur = self._pred[cur]
+        symbols.reverse()
+        return "".join(symbols)
 
-    queue: deque[Any] = deque(I)
-    visited = set(I)
-    pred: Dict[Any, Tuple[Any, Optional[str]]] = {}
-
-    adj: Dict[Any, List[Tuple[Optional[str], Any]]] = {}
-    for p, a, q in transitions:
-        adj.setdefault(p, []).append((a, q))
-
-    while queue:
-        p = queue.popleft()
-        for a, q in adj.get(p, []):
-            if q in visited:
-                continue
-            visited.add(q)
-            pred[q] = (p, a)
-            if q in F:
-                symbols: List[str] = []
-                cur = q
-                while cur in pred:
-                    prev, sym = pred[cur]
-                    if sym is not None:
-                        symbols.append(sym)
-                    cur = prev
-                symbols.reverse()
-                return "".join(symbols)
-            queue.append(q)
-    return None
 
 def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -66,13 +434,50 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser.add_argument(
         "-f",
         "--file",
-        help="Read automaton JSON from file; otherwise read from stdin.",
+        help="Read automaton JSON (or a compiled binary file) from file; "
+        "otherwise read JSON from stdin.",
     )
     parser.add_argument(
         "--demo",
         action="store_true",
         help="Run a small demo automaton instead of reading input.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the JSON input straight into the compiled automaton "
+        "(lower peak memory for very large Delta lists).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep a compiled binary copy of the JSON file (keyed by its "
+        "SHA-256) and map it instead of parsing on later runs.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("forward", "bidirectional", "levels"),
+        default="forward",
+        help="Search strategy: forward BFS from I (default), bidirectional "
+        "BFS from I and F, or level-synchronous bulk BFS.",
+    )
+    parser.add_argument(
+        "--words",
+        type=int,
+        metavar="K",
+        help="Stream the first K accepted words (shortest first, no duplicates) "
+        "as NDJSON lines instead of a single witness.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print phase times and search counters as one JSON object to stderr.",
+    )
+    parser.add_argument(
+        "--stats-memory",
+        action="store_true",
+        help="Like --stats, plus the tracemalloc peak (peak_bytes; slower).",
+    )
     return parser.parse_args(argv)
 
 
@@ -89,19 +494,40 @@ def _demo_automaton() -> Dict[str, Any]:
     }
 
 
+def _load_automaton(args: argparse.Namespace) -> CompiledAutomaton:
+    if args.demo:
+        return compile_from_dict(_demo_automaton())
+    return load_input(args.file, stream=args.stream, cache=args.cache)
+
+
 def main(argv: Sequence[str]) -> int:
     args = _parse_args(argv)
-    data = _demo_automaton() if args.demo else read_json_input(args.file)
+    prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
+    stats = prof.counters if prof else None
 
     try:
-        witness = find_witness(
-            data["Q"], data.get("Sigma", []), data["I"], data["F"], data["Delta"]
-        )
+        with prof or contextlib.nullcontext():
+            with phase("load"):
+                automaton = _load_automaton(args)
+            with phase("solve"):
+                if args.words is not None:
+                    with contextlib.closing(iter_witnesses(automaton, stats)) as words:
+                        print_words(words, args.words)
+                elif args.mode == "bidirectional":
+                    witness = find_witness_bidirectional(automaton, stats)
+                elif args.mode == "levels":
+                    witness = find_witness_levels(automaton, stats)
+                else:
+                    witness = find_witness_compiled(automaton, stats)
     except (KeyError, ValueError) as exc:
         print(f"Input error: {exc}", file=sys.stderr)
         return 2
 
-    print(format_witness(witness))
+    if args.words is None:
+        print(format_witness(witness))
+    if prof:
+        prof.add_closure_stats([automaton])
+        print_stats(prof.as_dict())
     return 0
 
 
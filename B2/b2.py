@@ -1,22 +1,37 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import json
 import sys
+from array import array
 from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Set, FrozenSet
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from shared.automaton_common import (
-    build_adj,
-    epsilon_closure,
     format_witness,
-    normalize_symbol,
-    parse_transitions,
-    read_json_input,
 )
+from shared.compiled import (
+    CompiledAutomaton,
+    compile_automaton,
+    compile_from_dict,
+    is_deterministic,
+)
+from shared.binary import load_input
+from shared.budget import EXIT_BUDGET, Budget, BudgetExceeded
+from shared.instrument import Profile, phase, print_stats
+from shared.reduction import REDUCTIONS, subset_construction
+from shared.search import SearchTree
+from shared.subset import MacroAntichain, SubsetConstruction
+from shared.words import iter_dfa_words, print_words
+
+# The empty macro-state: no run of A survives, so every extension is rejected.
+SINK = 0
+
 
 def find_witness_for_complement(
     states: Iterable[Any],
@@ -25,56 +40,278 @@ def find_witness_for_complement(
     finals: Iterable[Any],
     delta: Any,
 ) -> Optional[str]:
-    Q = set(states)
-    Sigma = set(normalize_symbol(s) for s in alphabet if normalize_symbol(s) is not None)
-    I = set(initials)
-    F = set(finals)
-    transitions = parse_transitions(delta)
-    adj = build_adj(transitions)
+    automaton = compile_automaton(states, alphabet, initials, finals, delta)
+    return find_witness_for_complement_compiled(automaton)
 
-    initial_closure = epsilon_closure(I, adj)
+
+def find_witness_for_complement_compiled(
+    automaton: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    reduce: Optional[str] = None,
+    fast_path: bool = True,
+    budget: Optional[Budget] = None,
+    antichain: bool = False,
+) -> Optional[str]:
+    """
+    Shortest word not accepted by the automaton, or None if it is universal.
+    With a budget, BudgetExceeded is raised once a limit is hit (unknown).
+    antichain=True only expands ⊆-minimal macro-states (see
+    find_witness_for_complement_antichain).
+    """
+    deterministic = is_deterministic(automaton)
+    if stats is not None:
+        stats["deterministic"] = int(deterministic)
+        stats["fast_path"] = int(deterministic and fast_path)
+    if deterministic and fast_path:
+        # Every macro-state would be a single state: search A directly.
+        return _dfa_complement_witness(automaton, stats, budget)
+
+    Sigma = automaton.sigma
+    # reduce="bisim"/"sim" shrinks A (shared.reduction) before the subset
+    # construction; symbol ids are kept, so witnesses are spelled the same.
+    subsets = subset_construction(automaton, reduce, stats)
+
+    # Macro-states are int bitsets over the state ids of the automaton.
+    initial_closure = subsets.start
 
     # Check if ε is accepted (i.e., if ε-closure contains a final state)
-    if any(q in F for q in initial_closure):
+    if subsets.is_accepting(initial_closure):
         # ε is accepted by A, so it is NOT in L(A)^c.
         # We need to find a non-empty word in L(A)^c.
         pass
     else:
         # ε is NOT accepted by A, so it is in L(A)^c.
         return ""
+    if antichain:
+        return _antichain_complement_witness(automaton, subsets, stats, budget)
+
+    # BFS to find a non-empty word in L(A)^c. Macro-states are numbered in
+    # discovery order: nodes[i] is the bitset, tree holds the predecessor
+    # columns, and only visited hashes the bitsets themselves.
+    visited: Set[int] = {initial_closure}
+    nodes: List[int] = [initial_closure]
+    tree = SearchTree(1)
+    parent_append, symbol_append = tree.parent.append, tree.symbol.append
+    queue: deque[int] = deque([0])
+
+    try:
+        while queue:
+            index = queue.popleft()
+            current = nodes[index]
+            if budget is not None:
+                budget.check(len(visited), len(visited))
+            # Only symbols on outgoing edges of current are expanded; every other
+            # symbol of Sigma leads to the shared sink ∅, which is never accepting.
+            moves = subsets.post_all(current)
+            for sym in Sigma:
+                next_state_closure = moves.get(sym, SINK)
+                if next_state_closure == SINK:
+                    return tree.word(automaton, tree.add(index, sym))
+                if next_state_closure not in visited:
+                    visited.add(next_state_closure)
+                    nxt = len(nodes)
+                    nodes.append(next_state_closure)
+                    parent_append(index)
+                    symbol_append(sym)
+                    if not subsets.is_accepting(next_state_closure):
+                        # This is a final state in the complement automaton
+                        return tree.word(automaton, nxt)
+                    queue.append(nxt)
+        return None
+    except BudgetExceeded as exc:
+        exc.add_stats(
+            stats,
+            visited=len(visited),
+            macro_states=len(visited),
+            frontier=len(queue),
+            depth=tree.depth(index),
+        )
+        raise
+    finally:
+        if stats is not None:
+            stats["visited"] = len(visited)
+            stats["pred"] = len(tree)
+
+
+def find_witness_for_complement_antichain(
+    automaton: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    reduce: Optional[str] = None,
+    fast_path: bool = True,
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    """
+    Universality check with antichain pruning; same contract as
+    find_witness_for_complement_compiled.
+
+    A macro-state S that contains an already discovered macro-state T is
+    never expanded: post(T, w) ⊆ post(S, w) for every word w, so whatever
+    rejects from S also rejects from T, which is at most as deep. Witnesses
+    are therefore still shortest (the word may differ from the plain search).
+    stats also gets subsumed (successors skipped as supersets of a stored
+    macro-state), evicted (stored macro-states replaced by a new subset),
+    dropped (evicted before being expanded) and antichain (final size).
+    """
+    return find_witness_for_complement_compiled(
+        automaton, stats, reduce, fast_path, budget, antichain=True
+    )
+
 
-    # BFS to find a non-empty word in L(A)^c
-    visited: Set[FrozenSet[Any]] = set()
-    queue = deque()
-    queue.append(initial_closure)
-    visited.add(initial_closure)
-    pred: Dict[FrozenSet[Any], Tuple[FrozenSet[Any], Optional[str]]] = {}
-
-    while queue:
-        current = queue.popleft()
-        for sym in Sigma:
-            next_state = set()
-            for q in current:
-                for transition_sym, r in adj.get(q, []):
-                    if transition_sym == sym:
-                        next_state.add(r)
-            next_state_closure = epsilon_closure(next_state, adj)
-            if next_state_closure not in visited:
-                visited.add(next_state_closure)
-                pred[next_state_closure] = (current, sym)
-                if not any(q in F for q in next_state_closure):
-                    # This is a final state in the complement automaton
-                    symbols: List[str] = []
-                    cur = next_state_closure
-                    while cur in pred:
-                        prev, s = pred[cur]
-                        if s is not None:
-                            symbols.append(s)
-                        cur = prev
-                    symbols.reverse()
-                    return "".join(symbols)
-                queue.append(next_state_closure)
-    return None
+def _antichain_complement_witness(
+    automaton: CompiledAutomaton,
+    subsets: SubsetConstruction,
+    stats: Optional[Dict[str, int]],
+    budget: Optional[Budget],
+) -> Optional[str]:
+    Sigma = automaton.sigma
+    start = subsets.start
+    chain = MacroAntichain(subsets.automaton.num_states)
+    chain.insert(start)
+    # index_of covers the macro-states currently in chain. An evicted node
+    # that is still queued is skipped only if its evictor is equally deep;
+    # a shallower one is still expanded, which keeps witnesses shortest.
+    index_of: Dict[int, int] = {start: 0}
+    nodes: List[int] = [start]
+    depth = array("i", [0])
+    dropped = bytearray(1)
+    tree = SearchTree(1)
+    queue: deque[int] = deque([0])
+    subsumed = evicted = dropped_count = 0
+
+    try:
+        while queue:
+            index = queue.popleft()
+            if dropped[index]:
+                dropped_count += 1
+                continue
+            if budget is not None:
+                budget.check(len(nodes), len(nodes))
+            current = nodes[index]
+            moves = subsets.post_all(current)
+            level = depth[index] + 1
+            for sym in Sigma:
+                nxt = moves.get(sym, SINK)
+                if nxt == SINK or not subsets.is_accepting(nxt):
+                    return tree.word(automaton, tree.add(index, sym))
+                if nxt in chain:
+                    continue
+                if chain.covers(nxt):
+                    subsumed += 1
+                    continue
+                for mask in chain.insert(nxt):
+                    evicted += 1
+                    old = index_of.pop(mask)
+                    if depth[old] == level:
+                        dropped[old] = 1
+                new = tree.add(index, sym)
+                index_of[nxt] = new
+                nodes.append(nxt)
+                depth.append(level)
+                dropped.append(0)
+                queue.append(new)
+        return None
+    except BudgetExceeded as exc:
+        exc.add_stats(
+            stats,
+            visited=len(nodes),
+            macro_states=len(nodes),
+            frontier=len(queue),
+            depth=depth[index],
+        )
+        raise
+    finally:
+        if stats is not None:
+            stats["visited"] = len(nodes)
+            stats["pred"] = len(tree)
+            stats["subsumed"] = subsumed
+            stats["evicted"] = evicted
+            stats["dropped"] = dropped_count
+            stats["antichain"] = len(chain)
+
+
+def iter_witnesses_for_complement(
+    automaton: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    reduce: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Iterator[str]:
+    """
+    Every word of L(A)^c over Sigma, shortest first and without duplicates
+    (shared.words.iter_dfa_words on the macro-states; missing transitions
+    lead to the empty macro-state, which accepts every continuation). The
+    budget is checked per macro-state expanded, also between two words.
+    """
+    subsets = subset_construction(automaton, reduce, stats)
+    Sigma = automaton.sigma
+
+    def moves(mask: int) -> Dict[int, int]:
+        successors = subsets.post_all(mask)
+        return {a: successors.get(a, SINK) for a in Sigma}
+
+    def rejected(mask: int) -> bool:
+        return not subsets.is_accepting(mask)
+
+    return iter_dfa_words(automaton, subsets.start, moves, rejected, stats, budget)
+
+
+def _dfa_complement_witness(
+    automaton: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    """
+    Complement witness of a deterministic automaton: BFS over its states
+    for a non-final state or a missing transition (the implicit sink).
+    Explores states in the same order as the subset BFS above explores the
+    singleton macro-states, so both return the same witness.
+    """
+    Sigma = automaton.sigma
+    finals = automaton.finals
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    if not automaton.initials or not finals[automaton.initials[0]]:
+        return ""
+
+    # States are the search nodes, so the predecessor columns are indexed by
+    # state id; the implicit sink gets the extra index num_states.
+    start = automaton.initials[0]
+    sink = automaton.num_states
+    visited = bytearray(automaton.num_states)
+    visited[start] = 1
+    count = 1
+    tree = SearchTree(sink + 1)
+    parent, symbol = tree.parent, tree.symbol
+    queue: deque[int] = deque([start])
+
+    try:
+        while queue:
+            current = queue.popleft()
+            if budget is not None:
+                budget.check(count)
+            lo, hi = sym_ptr[current], sym_ptr[current + 1]
+            row = dict(zip(edge_sym[lo:hi], sym_dst[lo:hi]))
+            for sym in Sigma:
+                nxt = row.get(sym)
+                if nxt is None:
+                    # No sym-edge: the run dies, so the word is rejected.
+                    parent[sink] = current
+                    symbol[sink] = sym
+                    return tree.word(automaton, sink)
+                if not visited[nxt]:
+                    visited[nxt] = 1
+                    count += 1
+                    parent[nxt] = current
+                    symbol[nxt] = sym
+                    if not finals[nxt]:
+                        return tree.word(automaton, nxt)
+                    queue.append(nxt)
+        return None
+    except BudgetExceeded as exc:
+        exc.add_stats(stats, visited=count, frontier=len(queue), depth=tree.depth(current))
+        raise
+    finally:
+        if stats is not None:
+            stats["visited"] = count
+            stats["pred"] = count
 
 
 def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
@@ -84,13 +321,84 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser.add_argument(
         "-f",
         "--file",
-        help="Read automaton JSON from file; otherwise read from stdin.",
+        help="Read automaton JSON (or a compiled binary file) from file; "
+        "otherwise read JSON from stdin.",
     )
     parser.add_argument(
         "--demo",
         action="store_true",
         help="Run a small demo automaton instead of reading input.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the JSON input straight into the compiled automaton "
+        "(lower peak memory for very large Delta lists).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep a compiled binary copy of the JSON file (keyed by its "
+        "SHA-256) and map it instead of parsing on later runs.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("subset", "antichain"),
+        default="subset",
+        help="subset: plain BFS over all macro-states; "
+        "antichain: only expand ⊆-minimal macro-states (subsumption pruning).",
+    )
+    parser.add_argument(
+        "--reduce",
+        choices=REDUCTIONS,
+        help="Shrink the automaton before determinization: ε-elimination and "
+        "bisimulation quotient (bisim), plus simulation quotient and "
+        "macro-state pruning (sim).",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Use the subset construction even if the automaton is deterministic.",
+    )
+    parser.add_argument(
+        "--words",
+        type=int,
+        metavar="K",
+        help="Stream the first K words of the complement (shortest first, no "
+        "duplicates) as NDJSON lines instead of a single witness.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print phase times and search counters as one JSON object to stderr.",
+    )
+    parser.add_argument(
+        "--stats-memory",
+        action="store_true",
+        help="Like --stats, plus the tracemalloc peak (peak_bytes; slower).",
+    )
+    parser.add_argument(
+        "--max-states",
+        type=int,
+        help="Give up (result unknown, exit code 3) after this many macro-states.",
+    )
+    parser.add_argument(
+        "--max-macro-states",
+        type=int,
+        help="Same as --max-states for B2 (every search node is a macro-state).",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Give up (result unknown, exit code 3) after this much wall time.",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        metavar="MB",
+        help="Give up (result unknown, exit code 3) once the process RSS "
+        "exceeds this many MiB.",
+    )
     return parser.parse_args(argv)
 
 def _demo_automaton() -> Dict[str, Any]:
@@ -105,19 +413,55 @@ def _demo_automaton() -> Dict[str, Any]:
         ],
     }
 
+def _load_automaton(args: argparse.Namespace) -> CompiledAutomaton:
+    if args.demo:
+        return compile_from_dict(_demo_automaton())
+    return load_input(args.file, stream=args.stream, cache=args.cache)
+
+
 def main(argv: Sequence[str]) -> int:
     args = _parse_args(argv)
-    data = _demo_automaton() if args.demo else read_json_input(args.file)
+    prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
 
     try:
-        witness = find_witness_for_complement(
-            data["Q"], data.get("Sigma", []), data["I"], data["F"], data["Delta"]
-        )
+        with prof or contextlib.nullcontext():
+            with phase("load"):
+                automaton = _load_automaton(args)
+            with phase("solve"):
+                if args.words is not None:
+                    words = iter_witnesses_for_complement(
+                        automaton,
+                        prof.counters if prof else None,
+                        reduce=args.reduce,
+                        budget=Budget.from_args(args),
+                    )
+                    with contextlib.closing(words):
+                        print_words(words, args.words)
+                else:
+                    witness = find_witness_for_complement_compiled(
+                        automaton,
+                        stats=prof.counters if prof else None,
+                        reduce=args.reduce,
+                        fast_path=not args.no_fast_path,
+                        budget=Budget.from_args(args),
+                        antichain=args.mode == "antichain",
+                    )
     except (KeyError, ValueError) as exc:
         print(f"Input error: {exc}", file=sys.stderr)
         return 2
+    except BudgetExceeded as exc:
+        if args.words is None:
+            print("unknown")
+        print(f"Budget exceeded: {exc} {json.dumps(exc.stats, sort_keys=True)}", file=sys.stderr)
+        if prof:
+            print_stats(prof.as_dict())
+        return EXIT_BUDGET
 
-    print(format_witness(witness))
+    if args.words is None:
+        print(format_witness(witness))
+    if prof:
+        prof.add_closure_stats([automaton])
+        print_stats(prof.as_dict())
     return 0
 
 if __name__ == "__main__":
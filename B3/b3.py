@@ -2,10 +2,15 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import json
 import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import deque
+from itertools import product
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
@@ -13,10 +18,18 @@ if str(ROOT_DIR) not in sys.path:
 
 from shared.automaton_common import (
     format_witness,
-    index_transitions,
-    parse_transitions,
-    read_json_input,
 )
+from shared.compiled import (
+    CompiledAutomaton,
+    compile_from_dict,
+)
+from shared.binary import iter_automata, load_input, load_input_pair
+from shared.closure import iter_bits, mask_of
+from shared.instrument import Profile, phase, print_stats
+from shared.reduction import eliminate_epsilon
+from shared.search import SearchTree
+from shared.trim import live_states
+from shared.words import iter_dfa_words, print_words
 
 
 def intersection_witness(
@@ -34,87 +47,396 @@ def intersection_witness(
       - "ab..." for a witness in L(A1) ∩ L(A2)
       - None if intersection is empty (⊥)
     """
-    I1: Set[Any] = set(A1["I"])
-    F1: Set[Any] = set(A1["F"])
-    I2: Set[Any] = set(A2["I"])
-    F2: Set[Any] = set(A2["F"])
+    return intersection_witness_compiled(compile_from_dict(A1), compile_from_dict(A2))
+
+
+def intersection_witness_compiled(
+    C1: CompiledAutomaton,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    trim: bool = True,
+    eps_free: bool = False,
+) -> Optional[str]:
+    """
+    Product BFS on two compiled automata.
+
+    A product state (q1, q2) is encoded as the int q1 * |Q2| + q2; the symbol
+    tables of C1 and C2 may differ and are joined through C1.symbol_map(C2).
+    With trim, both automata are first reduced to their live states
+    (reachable and co-reachable); pairs with a dead component are never
+    enqueued, and if no start pair is live the result is ⊥ without any
+    product search. If stats is given, the number of visited product states
+    and of pruned states per automaton are stored in it. eps_free replaces
+    both automata by equivalent ε-free ones first (shared.reduction), so the
+    product only takes synchronous symbol steps.
+    """
+    return intersection_witness_prepared(PreparedProperty(C1, trim, eps_free), C2, stats)
+
+
+class PreparedProperty:
+    """
+    Left-hand automaton A1 prepared for intersections with many A2: its
+    live-state mask is computed once and symbol maps are cached per A2
+    symbol table, so each check only trims and searches with the new A2.
+    With eps_free, A1 is replaced by an equivalent ε-free automaton once.
+    trim and eps_free also apply to every A2 checked against the property.
+    """
+
+    def __init__(
+        self, automaton: CompiledAutomaton, trim: bool = True, eps_free: bool = False
+    ) -> None:
+        if eps_free:
+            automaton = eliminate_epsilon(automaton)
+        self.automaton = automaton
+        self.trim = trim
+        self.eps_free = eps_free
+        n = automaton.num_states
+        self.live = live_states(automaton) if trim else b"\x01" * n
+        self.pruned = n - self.live.count(1)
+        self._maps: Dict[Tuple[str, ...], Sequence[int]] = {}
 
-    # Product start set I := I1 × I2
-    I_prod: Set[Tuple[Any, Any]] = {(i1, i2) for i1 in I1 for i2 in I2}
+    def symbol_map(self, other: CompiledAutomaton) -> Sequence[int]:
+        key = tuple(other.symbols)
+        to2 = self._maps.get(key)
+        if to2 is None:
+            to2 = self.automaton.symbol_map(other)
+            self._maps[key] = to2
+        return to2
+
+
+def intersection_witness_prepared(
+    prop: PreparedProperty,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+) -> Optional[str]:
+    """
+    intersection_witness_compiled(prop.automaton, C2) reusing prop's index,
+    with prop's trim and eps_free settings.
+    """
+    C1 = prop.automaton
+    if prop.eps_free:
+        C2 = eliminate_epsilon(C2)
+    n2 = C2.num_states
+    F1 = C1.finals
+    F2 = C2.finals
+    ptr1, dst1, esym1 = C1.sym_ptr, C1.sym_dst, C1.edge_sym
+    ptr2, dst2, esym2 = C2.sym_ptr, C2.sym_dst, C2.edge_sym
+    eptr1, edst1 = C1.eps_ptr, C1.eps_dst
+    eptr2, edst2 = C2.eps_ptr, C2.eps_dst
+    to2 = prop.symbol_map(C2)
+
+    live1 = prop.live
+    live2 = live_states(C2) if prop.trim else b"\x01" * n2
+    if stats is not None:
+        stats["pruned_a1"] = prop.pruned
+        stats["pruned_a2"] = n2 - live2.count(1)
+        stats["visited"] = 0
+
+    # Product start set I := I1 × I2 (live pairs only)
+    I_prod: List[int] = [
+        i1 * n2 + i2
+        for i1 in C1.initials
+        if live1[i1]
+        for i2 in C2.initials
+        if live2[i2]
+    ]
+    if not I_prod:
+        # Some automaton has an empty language after trimming => ⊥
+        return None
 
     # If a start pair is already accepting -> ε
-    for i1, i2 in I_prod:
-        if i1 in F1 and i2 in F2:
+    for node in I_prod:
+        if F1[node // n2] and F2[node % n2]:
             return ""
 
-    # Parse and index transitions
-    t1 = parse_transitions(A1["Delta"])
-    t2 = parse_transitions(A2["Delta"])
-    eps1, sym1 = index_transitions(t1)
-    eps2, sym2 = index_transitions(t2)
-
-    # Multi-source BFS init
-    queue: deque[Tuple[Any, Any]] = deque(I_prod)
-    visited: Set[Tuple[Any, Any]] = set(I_prod)
-    pred: Dict[Tuple[Any, Any], Tuple[Tuple[Any, Any], Optional[str]]] = {}
-    # pred[(q1,q2)] = ((p1,p2), x) where x in Σ ∪ {ε}; we represent ε as None
-
-    # Helper: reconstruct word from accepting product state
-    def reconstruct(end_pair: Tuple[Any, Any]) -> str:
-        symbols: List[str] = []
-        cur = end_pair
-        while cur in pred:
-            prev, x = pred[cur]
-            if x is not None:
-                symbols.append(x)
-            cur = prev
-        symbols.reverse()
-        return "".join(symbols)
+    # Multi-source BFS init. Pairs are numbered in discovery order:
+    # nodes[i] = q1 * n2 + q2, and tree[i] = (parent index, x) where x is a
+    # symbol id of C1; ε is EPS_ID
+    visited: Set[int] = set(I_prod)
+    nodes = array("q", I_prod)
+    tree = SearchTree(len(I_prod))
+    parent_append, symbol_append = tree.parent.append, tree.symbol.append
+    queue: deque[int] = deque(range(len(I_prod)))
 
     # BFS
-    while queue:
-        p1, p2 = queue.popleft()
+    try:
+        while queue:
+            index = queue.popleft()
+            p1, p2 = divmod(nodes[index], n2)
 
-        # 1) epsilon moves in A1 only: ((p1,p2), ε, (q1,p2))
-        for q1 in eps1.get(p1, []):
-            nxt = (q1, p2)
-            if nxt not in visited:
-                visited.add(nxt)
-                pred[nxt] = ((p1, p2), None)
-                if q1 in F1 and p2 in F2:
-                    return reconstruct(nxt)
-                queue.append(nxt)
-
-        # 2) epsilon moves in A2 only: ((p1,p2), ε, (p1,q2))
-        for q2 in eps2.get(p2, []):
-            nxt = (p1, q2)
-            if nxt not in visited:
-                visited.add(nxt)
-                pred[nxt] = ((p1, p2), None)
-                if p1 in F1 and q2 in F2:
-                    return reconstruct(nxt)
-                queue.append(nxt)
-
-        # 3) symbol-synchronous moves:
-        # For each symbol a where both have outgoing transitions, combine targets.
-        out1 = sym1.get(p1, {})
-        out2 = sym2.get(p2, {})
-        if out1 and out2:
-            common_syms = out1.keys() & out2.keys()
-            for a in common_syms:
-                for q1 in out1[a]:
-                    for q2 in out2[a]:
-                        nxt = (q1, q2)
-                        if nxt in visited:
+            # 1) epsilon moves in A1 only: ((p1,p2), ε, (q1,p2))
+            for i in range(eptr1[p1], eptr1[p1 + 1]):
+                q1 = edst1[i]
+                nxt = q1 * n2 + p2
+                if live1[q1] and nxt not in visited:
+                    visited.add(nxt)
+                    new = len(nodes)
+                    nodes.append(nxt)
+                    parent_append(index)
+                    symbol_append(-1)
+                    if F1[q1] and F2[p2]:
+                        return tree.word(C1, new)
+                    queue.append(new)
+
+            # 2) epsilon moves in A2 only: ((p1,p2), ε, (p1,q2))
+            base1 = p1 * n2
+            for i in range(eptr2[p2], eptr2[p2 + 1]):
+                q2 = edst2[i]
+                nxt = base1 + q2
+                if live2[q2] and nxt not in visited:
+                    visited.add(nxt)
+                    new = len(nodes)
+                    nodes.append(nxt)
+                    parent_append(index)
+                    symbol_append(-1)
+                    if F1[p1] and F2[q2]:
+                        return tree.word(C1, new)
+                    queue.append(new)
+
+            # 3) symbol-synchronous moves:
+            # Walk the row of p1 one symbol run at a time and join with the
+            # run of (p2, a) in the row of p2 (both rows are sorted by symbol).
+            i = ptr1[p1]
+            end1 = ptr1[p1 + 1]
+            start2, end2 = ptr2[p2], ptr2[p2 + 1]
+            while i < end1:
+                a = esym1[i]
+                run_end = bisect_right(esym1, a, i, end1)
+                a2 = to2[a]
+                if a2 >= 0 and start2 < end2:
+                    lo2 = bisect_left(esym2, a2, start2, end2)
+                    hi2 = bisect_right(esym2, a2, lo2, end2)
+                    for x in range(i, run_end):
+                        q1 = dst1[x]
+                        if not live1[q1]:
                             continue
-                        visited.add(nxt)
-                        pred[nxt] = ((p1, p2), a)
-                        if q1 in F1 and q2 in F2:
-                            return reconstruct(nxt)
-                        queue.append(nxt)
+                        for y in range(lo2, hi2):
+                            q2 = dst2[y]
+                            nxt = q1 * n2 + q2
+                            if not live2[q2] or nxt in visited:
+                                continue
+                            visited.add(nxt)
+                            new = len(nodes)
+                            nodes.append(nxt)
+                            parent_append(index)
+                            symbol_append(a)
+                            if F1[q1] and F2[q2]:
+                                return tree.word(C1, new)
+                            queue.append(new)
+                i = run_end
+
+        # No accepting product state reachable => empty intersection
+        return None
+    finally:
+        if stats is not None:
+            stats["visited"] = len(visited)
+            stats["pred"] = len(tree)
+
+
+def iter_intersection_words(
+    automata: Sequence[CompiledAutomaton],
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[str]:
+    """
+    Every word of the intersection of automata, shortest first and without
+    duplicates, over the first automaton's symbol table.
+
+    The product is never built up front: all automata are made ε-free, and
+    shared.words.iter_dfa_words walks the subset construction of their
+    product. A product node (one state per automaton) gets a number and its
+    symbol row only when the walk first reaches it; macro-states are
+    bitsets over these numbers. stats gets states (macro-states expanded),
+    levels, words and product (product nodes numbered).
+    """
+    if not automata:
+        raise ValueError("Intersection of zero automata is not defined.")
+    comps = [eliminate_epsilon(C) for C in automata]
+    lead = comps[0]
+    maps = [lead.symbol_map(C) for C in comps]
+    finals = [C.finals for C in comps]
+    index: Dict[Tuple[int, ...], int] = {}
+    nodes: List[Tuple[int, ...]] = []
+    rows: List[Optional[Dict[int, int]]] = []
+    accepting = [0]  # bitset of the accepting product nodes numbered so far
+
+    def add(node: Tuple[int, ...]) -> int:
+        i = index.get(node)
+        if i is None:
+            i = index[node] = len(nodes)
+            nodes.append(node)
+            rows.append(None)
+            if all(F[q] for F, q in zip(finals, node)):
+                accepting[0] |= 1 << i
+        return i
+
+    def row(i: int) -> Dict[int, int]:
+        """Successor bitset per lead symbol id of product node i."""
+        moves = rows[i]
+        if moves is None:
+            moves = {}
+            node = nodes[i]
+            ptr0, dst0, esym0 = lead.sym_ptr, lead.sym_dst, lead.edge_sym
+            x, end0 = ptr0[node[0]], ptr0[node[0] + 1]
+            while x < end0:
+                a = esym0[x]
+                run_end = bisect_right(esym0, a, x, end0)
+                targets = [dst0[x:run_end]]
+                x = run_end
+                for j in range(1, len(comps)):
+                    aj = maps[j][a]
+                    if aj < 0:
+                        break
+                    lo, hi = comps[j].run(node[j], aj)
+                    if lo == hi:
+                        break
+                    targets.append(comps[j].sym_dst[lo:hi])
+                else:
+                    mask = 0
+                    for nxt in product(*targets):
+                        mask |= 1 << add(nxt)
+                    moves[a] = mask
+            rows[i] = moves
+        return moves
+
+    def post_all(mask: int) -> Dict[int, int]:
+        moves: Dict[int, int] = {}
+        for i in iter_bits(mask):
+            for a, targets in row(i).items():
+                moves[a] = moves.get(a, 0) | targets
+        return moves
+
+    start = mask_of(add(node) for node in product(*(C.initials for C in comps)))
+    words = iter_dfa_words(lead, start, post_all, lambda mask: bool(mask & accepting[0]), stats)
+    try:
+        yield from words
+    finally:
+        words.close()
+        if stats is not None:
+            stats["product"] = len(nodes)
+
+
+def iter_intersection_witnesses(
+    C1: CompiledAutomaton,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[str]:
+    """
+    Every word of L(A1) ∩ L(A2), shortest first and without duplicates
+    (iter_intersection_words on [C1, C2]).
+    """
+    return iter_intersection_words([C1, C2], stats)
+
+
+def intersection_witness_kway(
+    automata: Sequence[CompiledAutomaton],
+    stats: Optional[Dict[str, int]] = None,
+    trim: bool = True,
+    eps_free: bool = False,
+) -> Optional[str]:
+    """
+    Witness for the intersection of any number of compiled automata.
+
+    Product states are tuples with one state per automaton. ε-moves are
+    interleaved (one component moves, the others stay); a symbol move needs
+    every component to read the same symbol. Components are ordered by
+    selectivity (fewest edges per state first), so a symbol is dropped as
+    soon as the sparsest automata cannot read it, and dead states are pruned
+    as in the two-automaton search. Witnesses use the same format as
+    intersection_witness. stats gets visited and pruned_a<i> per automaton
+    (numbered as given). eps_free removes ε-edges from every automaton first.
+    """
+    if not automata:
+        raise ValueError("Intersection of zero automata is not defined.")
+    if eps_free:
+        automata = [eliminate_epsilon(C) for C in automata]
+    order = sorted(
+        range(len(automata)),
+        key=lambda j: (automata[j].num_transitions / max(1, automata[j].num_states), j),
+    )
+    comps = [automata[j] for j in order]
+    lead = comps[0]
+    # Symbol ids of the lead automaton translated into every component.
+    maps = [lead.symbol_map(C) for C in comps]
+    lives = [live_states(C) if trim else b"\x01" * C.num_states for C in comps]
+    if stats is not None:
+        for j, live in zip(order, lives):
+            stats[f"pruned_a{j + 1}"] = automata[j].num_states - live.count(1)
+        stats["visited"] = 0
 
-    # No accepting product state reachable => empty intersection
-    return None
+    initials = [[q for q in C.initials if live[q]] for C, live in zip(comps, lives)]
+    if not all(initials):
+        return None
+    finals = [C.finals for C in comps]
+
+    def accepting(node: Tuple[int, ...]) -> bool:
+        return all(F[q] for F, q in zip(finals, node))
+
+    starts = list(product(*initials))
+    if any(accepting(node) for node in starts):
+        return ""
+
+    visited: Set[Tuple[int, ...]] = set(starts)
+    nodes: List[Tuple[int, ...]] = list(starts)
+    tree = SearchTree(len(starts))
+    queue: deque[int] = deque(range(len(starts)))
+    ptr0, dst0, esym0 = lead.sym_ptr, lead.sym_dst, lead.edge_sym
+
+    try:
+        while queue:
+            index = queue.popleft()
+            node = nodes[index]
+            successors: List[Tuple[Tuple[int, ...], int]] = []
+
+            # ε-moves of one component at a time.
+            for j, C in enumerate(comps):
+                eptr, edst, live = C.eps_ptr, C.eps_dst, lives[j]
+                p = node[j]
+                for i in range(eptr[p], eptr[p + 1]):
+                    q = edst[i]
+                    if live[q]:
+                        successors.append((node[:j] + (q,) + node[j + 1 :], -1))
+
+            # Symbol moves: one run of the lead row per symbol, joined with
+            # the matching row of every other component.
+            i = ptr0[node[0]]
+            end0 = ptr0[node[0] + 1]
+            while i < end0:
+                a = esym0[i]
+                run_end = bisect_right(esym0, a, i, end0)
+                live0 = lives[0]
+                targets: List[List[int]] = [[q for q in dst0[i:run_end] if live0[q]]]
+                i = run_end
+                if not targets[0]:
+                    continue
+                for j in range(1, len(comps)):
+                    aj = maps[j][a]
+                    if aj < 0:
+                        break
+                    C = comps[j]
+                    lo, hi = C.run(node[j], aj)
+                    live = lives[j]
+                    row = [q for q in C.sym_dst[lo:hi] if live[q]]
+                    if not row:
+                        break
+                    targets.append(row)
+                else:
+                    successors.extend((nxt, a) for nxt in product(*targets))
+
+            for nxt, a in successors:
+                if nxt in visited:
+                    continue
+                visited.add(nxt)
+                nodes.append(nxt)
+                new = tree.add(index, a)
+                if accepting(nxt):
+                    return tree.word(lead, new)
+                queue.append(new)
+
+        return None
+    finally:
+        if stats is not None:
+            stats["visited"] = len(visited)
+            stats["pred"] = len(tree)
 
 
 def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
@@ -135,6 +457,67 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
         action="store_true",
         help="Run a small demo pair instead of reading input.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the JSON input straight into the compiled automaton "
+        "(lower peak memory for very large Delta lists).",
+    )
+    parser.add_argument(
+        "--a1",
+        help="Automaton file (JSON or compiled binary) for A1; use with --a2 "
+        "instead of a pair file.",
+    )
+    parser.add_argument(
+        "--a2",
+        help="Automaton file (JSON or compiled binary) for A2.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep compiled binary copies of the JSON input (keyed by its "
+        "SHA-256) and map them instead of parsing on later runs.",
+    )
+    parser.add_argument(
+        "--all",
+        nargs="+",
+        metavar="FILE",
+        help="Intersect all given automaton files (k-way product) instead of "
+        "a pair.",
+    )
+    parser.add_argument(
+        "--many",
+        metavar="SOURCE",
+        help="Intersect --a1 with many A2: SOURCE is a directory of automaton "
+        "files or an NDJSON file ('-' for stdin) of automata or "
+        "{\"id\": ..., \"A2\": automaton or path} records. A1 is prepared "
+        "once; one NDJSON result line per A2.",
+    )
+    parser.add_argument(
+        "--eps-free",
+        action="store_true",
+        help="Remove ε-edges (ε-closures folded into symbol edges) before the "
+        "product search, so it only takes synchronous steps.",
+    )
+    parser.add_argument(
+        "--words",
+        type=int,
+        metavar="K",
+        help="Stream the first K words of the intersection (shortest first, no "
+        "duplicates) as NDJSON lines instead of a single witness; with --all "
+        "of all given automata.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print phase times and search counters as one JSON object to stderr "
+        "(with --many: a \"stats\" field in every result line).",
+    )
+    parser.add_argument(
+        "--stats-memory",
+        action="store_true",
+        help="Like --stats, plus the tracemalloc peak (peak_bytes; slower).",
+    )
     return parser.parse_args(argv)
 
 
@@ -162,28 +545,100 @@ def _demo_automata() -> Tuple[Dict[str, Any], Dict[str, Any]]:
     return A1, A2
 
 
-def _load_automata(args: argparse.Namespace) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def _load_automata(
+    args: argparse.Namespace,
+) -> Tuple[CompiledAutomaton, CompiledAutomaton]:
     if args.demo:
-        return _demo_automata()
-    if args.file:
-        data = read_json_input(args.file)
-        return data["A1"], data["A2"]
-    if args.pair:
-        data = read_json_input(args.pair)
-        return data["A1"], data["A2"]
-    data = read_json_input(None)
-    return data["A1"], data["A2"]
+        A1, A2 = _demo_automata()
+        return compile_from_dict(A1), compile_from_dict(A2)
+    return load_input_pair(
+        args.file or args.pair, args.a1, args.a2, stream=args.stream, cache=args.cache
+    )
+
+
+def _run_many(args: argparse.Namespace) -> int:
+    """--many: one NDJSON line per A2; exit code 1 if any A2 failed."""
+    if not args.a1:
+        print("Input error: --many needs --a1.", file=sys.stderr)
+        return 2
+    try:
+        prop = PreparedProperty(
+            load_input(args.a1, args.stream, args.cache), eps_free=args.eps_free
+        )
+    except (KeyError, ValueError, OSError) as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    failed = 0
+    try:
+        # Records are loaded one by one (errors go into their line); only
+        # opening or reading SOURCE itself ends the run.
+        for a2_id, load in iter_automata(args.many, "A2", args.stream, args.cache):
+            record: Dict[str, Any] = {"id": a2_id}
+            prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
+            try:
+                with prof or contextlib.nullcontext():
+                    with phase("load"):
+                        A2 = load()
+                    with phase("solve"):
+                        witness = intersection_witness_prepared(
+                            prop, A2, prof.counters if prof else None
+                        )
+                record.update(witness=witness, result=format_witness(witness))
+                if prof:
+                    prof.add_closure_stats([A2])
+                    record["stats"] = prof.as_dict()
+            except (KeyError, ValueError, OSError) as exc:
+                failed += 1
+                record["error"] = f"{type(exc).__name__}: {exc}"
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    except OSError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
 
 
 def main(argv: Sequence[str]) -> int:
     args = _parse_args(argv)
+    if args.many:
+        if args.words is not None:
+            print("Input error: --words cannot be combined with --many.", file=sys.stderr)
+            return 2
+        return _run_many(args)
+    prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
+    stats = prof.counters if prof else None
     try:
-        A1, A2 = _load_automata(args)
-        witness = intersection_witness(A1, A2)
+        with prof or contextlib.nullcontext():
+            if args.words is not None:
+                with phase("load"):
+                    if args.all:
+                        automata = [
+                            load_input(path, args.stream, args.cache) for path in args.all
+                        ]
+                    else:
+                        automata = list(_load_automata(args))
+                with phase("solve"):
+                    words = iter_intersection_words(automata, stats)
+                    with contextlib.closing(words):
+                        print_words(words, args.words)
+            elif args.all:
+                with phase("load"):
+                    automata = [load_input(path, args.stream, args.cache) for path in args.all]
+                with phase("solve"):
+                    witness = intersection_witness_kway(automata, stats, eps_free=args.eps_free)
+            else:
+                with phase("load"):
+                    A1, A2 = _load_automata(args)
+                    automata = [A1, A2]
+                with phase("solve"):
+                    witness = intersection_witness_compiled(A1, A2, stats, eps_free=args.eps_free)
     except (KeyError, ValueError) as exc:
         print(f"Input error: {exc}", file=sys.stderr)
         return 2
-    print(format_witness(witness))
+    if args.words is None:
+        print(format_witness(witness))
+    if prof:
+        prof.add_closure_stats(automata)
+        print_stats(prof.as_dict())
     return 0
 
 
@@ -2,155 +2,588 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import json
 import sys
+from array import array
 from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, FrozenSet
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from shared.automaton_common import (
-    build_adj,
-    epsilon_closure,
     format_witness,
-    normalize_symbol,
-    parse_transitions,
-    read_json_input,
 )
-
-
-def _collect_sigma(
-    alphabets: Iterable[Any],
-    transitions: Iterable[Tuple[Any, Optional[str], Any]],
-) -> List[str]:
-    sigma: List[str] = []
-    seen: Set[str] = set()
-    for sym in alphabets:
-        norm = normalize_symbol(sym)
-        if norm is None:
-            continue
-        if norm not in seen:
-            seen.add(norm)
-            sigma.append(norm)
-    for _, sym, _ in transitions:
-        if sym is None:
-            continue
-        if sym not in seen:
-            seen.add(sym)
-            sigma.append(sym)
-    return sigma
-
-
-def _determinize_with_epsilon(
-    initials: Iterable[Any],
-    finals: Iterable[Any],
-    transitions: Sequence[Tuple[Any, Optional[str], Any]],
-    sigma: Sequence[str],
-) -> Tuple[
-    FrozenSet[Any],
-    Dict[FrozenSet[Any], Dict[str, FrozenSet[Any]]],
-    Set[Any],
-]:
-    adj = build_adj(transitions)
-    start = epsilon_closure(initials, adj)
-    det_transitions: Dict[FrozenSet[Any], Dict[str, FrozenSet[Any]]] = {}
-
-    queue: deque[FrozenSet[Any]] = deque([start])
-    visited: Set[FrozenSet[Any]] = {start}
-
-    while queue:
-        current = queue.popleft()
-        trans_map: Dict[str, FrozenSet[Any]] = {}
-        for sym in sigma:
-            move_set: Set[Any] = set()
-            for q in current:
-                for a, r in adj.get(q, []):
-                    if a == sym:
-                        move_set.add(r)
-            next_state = epsilon_closure(move_set, adj)
-            trans_map[sym] = next_state
-            if next_state not in visited:
-                visited.add(next_state)
-                queue.append(next_state)
-        det_transitions[current] = trans_map
-
-    return start, det_transitions, set(finals)
+from shared.compiled import (
+    CompiledAutomaton,
+    compile_from_dict,
+    is_deterministic,
+)
+from shared.binary import iter_automata, load_input, load_input_pair
+from shared.budget import EXIT_BUDGET, Budget, BudgetExceeded
+from shared.instrument import Profile, phase, print_stats
+from shared.reduction import REDUCTIONS, eliminate_epsilon, subset_construction
+from shared.search import SearchTree
+from shared.subset import SubsetConstruction
+from shared.trim import live_states
+from shared.words import iter_dfa_words, print_words
+
+
+class PreparedSpec:
+    """
+    Right-hand automaton A2 prepared for many inclusion checks.
+
+    The DFA of A2 (subset construction, optionally after --reduce) is built
+    lazily and kept: start is the ε-closure of I2, rows[s][a] is the
+    successor of state s under A2's symbol id a (-1 while not built yet), and
+    rejecting[s] is 1 for states of the complement DFA, i.e. macro-states
+    without a final state. Every check only adds the states and rows its A1
+    reaches. minimize() builds the whole DFA and replaces it by its minimal
+    DFA (Hopcroft); symbols A2 does not know always lead to the empty
+    macro-state.
+
+    If A2 is already deterministic (and fast_path is set), no subset
+    construction is done: the DFA states are A2's state ids plus a sink
+    (id num_states of A2) for missing transitions. Rows are then not stored
+    but read from the CSR table when asked for (row(), successor()); only
+    minimize() builds the dense table. stats gets deterministic and
+    fast_path.
+    """
+
+    def __init__(
+        self,
+        automaton: CompiledAutomaton,
+        reduce: Optional[str] = None,
+        minimize: bool = False,
+        stats: Optional[Dict[str, int]] = None,
+        fast_path: bool = True,
+    ) -> None:
+        self.automaton = automaton
+        deterministic = is_deterministic(automaton)
+        self.deterministic = deterministic and fast_path
+        if stats is not None:
+            stats["deterministic"] = int(deterministic)
+            stats["fast_path"] = int(self.deterministic)
+        self.macro_states: List[int] = []
+        self.rows: List[array] = []
+        self.rejecting = bytearray()
+        self.minimized = False
+        self._index: Dict[int, int] = {}
+        if self.deterministic:
+            self._load_dfa()
+        else:
+            self.subsets = subset_construction(automaton, reduce, stats)
+            self.start = self._add(self.subsets.start)
+        if minimize:
+            self.minimize()
+
+    @property
+    def num_states(self) -> int:
+        if self._csr_rows:
+            return self._sink + 1
+        return len(self.rows)
+
+    @property
+    def _csr_rows(self) -> bool:
+        """True while rows are read from A2's CSR table (fast path)."""
+        return self.deterministic and not self.minimized
+
+    def _add(self, mask: int) -> int:
+        sid = self._index.get(mask)
+        if sid is None:
+            sid = len(self.rows)
+            self._index[mask] = sid
+            self.macro_states.append(mask)
+            self.rows.append(array("i", [-1]) * self.automaton.num_symbols)
+            self.rejecting.append(0 if self.subsets.is_accepting(mask) else 1)
+        return sid
+
+    def _load_dfa(self) -> None:
+        automaton = self.automaton
+        sink = automaton.num_states
+        self.rejecting = bytearray(1 - f for f in automaton.finals)
+        self.rejecting.append(1)
+        self.start = automaton.initials[0] if len(automaton.initials) else sink
+        self._sink = sink
+        # One dense row, refilled per state by row(): O(k) memory in total.
+        self._scratch = array("i", [sink]) * automaton.num_symbols
+        self._scratch_state = sink
+        self._scratch_syms: Sequence[int] = ()
+
+    def row(self, s: int) -> Sequence[int]:
+        """
+        Successor per A2 symbol id of state s (-1 while not built yet). On
+        the fast path the row is a scratch array that the next call
+        overwrites.
+        """
+        if not self._csr_rows:
+            return self.rows[s]
+        scratch = self._scratch
+        if s == self._scratch_state:
+            return scratch
+        sink = self._sink
+        for a in self._scratch_syms:
+            scratch[a] = sink
+        automaton = self.automaton
+        if s < sink:
+            lo, hi = automaton.sym_ptr[s], automaton.sym_ptr[s + 1]
+            syms = automaton.edge_sym[lo:hi]
+            for a, t in zip(syms, automaton.sym_dst[lo:hi]):
+                scratch[a] = t
+        else:
+            syms = ()
+        self._scratch_syms = syms
+        self._scratch_state = s
+        return scratch
+
+    @property
+    def empty_id(self) -> int:
+        """The empty macro-state (rejects every word), added on first use."""
+        if self.deterministic:
+            return self._sink
+        return self._add(0)
+
+    def successor(self, s: int, a: int) -> int:
+        """DFA successor of state s under A2's symbol id a (a < 0: unknown symbol)."""
+        if a < 0:
+            return self.empty_id
+        if self._csr_rows:
+            if s == self._sink:
+                return s
+            lo, hi = self.automaton.run(s, a)
+            return self.automaton.sym_dst[lo] if lo < hi else self._sink
+        row = self.rows[s]
+        t = row[a]
+        if t < 0:
+            t = self._add(self.subsets.post(self.macro_states[s], a))
+            row[a] = t
+        return t
+
+    def determinize(
+        self, budget: Optional[Budget] = None, stats: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Build every reachable DFA state (states are numbered in BFS order)."""
+        if self.deterministic:
+            return
+        k = self.automaton.num_symbols
+        s = 0
+        try:
+            while s < len(self.rows):
+                if budget is not None:
+                    budget.check(s, len(self.rows))
+                for a in range(k):
+                    self.successor(s, a)
+                s += 1
+        except BudgetExceeded as exc:
+            exc.add_stats(stats, macro_states=len(self.rows), frontier=len(self.rows) - s)
+            raise
+
+    def minimize(self) -> None:
+        """Determinize completely and replace the DFA by its minimal DFA."""
+        if self.minimized:
+            return
+        self.empty_id
+        self.determinize()
+        if self.deterministic:
+            # Hopcroft needs the complete table; the sink row stays all sink.
+            self.rows = [array("i", self.row(s)) for s in range(self._sink + 1)]
+        block = _hopcroft(self.rows, self.rejecting, self.automaton.num_symbols)
+        # Renumber blocks by first state (the subset start state stays 0).
+        ids: Dict[int, int] = {}
+        first: List[int] = []
+        for s, b in enumerate(block):
+            if b not in ids:
+                ids[b] = len(first)
+                first.append(s)
+        self.rows = [array("i", (ids[block[t]] for t in self.rows[s])) for s in first]
+        self.rejecting = bytearray(self.rejecting[s] for s in first)
+        self.start = ids[block[self.start]]
+        if self.deterministic:
+            self._sink = ids[block[self._sink]]
+        else:
+            self.macro_states = [self.macro_states[s] for s in first]
+            self._index = {mask: ids[block[s]] for mask, s in self._index.items()}
+        self.minimized = True
+
+
+def _hopcroft(rows: Sequence[Sequence[int]], rejecting: bytearray, k: int) -> List[int]:
+    """Block id per state of the coarsest partition of a complete DFA (Hopcroft)."""
+    m = len(rows)
+    inverse: List[Dict[int, List[int]]] = [{} for _ in range(k)]
+    for s, row in enumerate(rows):
+        for a in range(k):
+            inverse[a].setdefault(row[a], []).append(s)
+    blocks: List[Set[int]] = []
+    for flag in (0, 1):
+        members = {s for s in range(m) if rejecting[s] == flag}
+        if members:
+            blocks.append(members)
+    block = [0] * m
+    for b, members in enumerate(blocks):
+        for s in members:
+            block[s] = b
+    smaller = min(range(len(blocks)), key=lambda b: len(blocks[b]))
+    work: Set[Tuple[int, int]] = {(smaller, a) for a in range(k)} if len(blocks) > 1 else set()
+    while work:
+        splitter, a = work.pop()
+        row = inverse[a]
+        sources: Dict[int, List[int]] = {}
+        for t in blocks[splitter]:
+            for s in row.get(t, ()):
+                sources.setdefault(block[s], []).append(s)
+        for b, hit in sources.items():
+            members = blocks[b]
+            if len(hit) == len(members):
+                continue
+            hit_set = set(hit)
+            rest = members - hit_set
+            # b keeps the larger half; the smaller one becomes a new block
+            # and is a splitter for every symbol (Hopcroft's rule).
+            small, large = (hit_set, rest) if len(hit_set) <= len(rest) else (rest, hit_set)
+            blocks[b] = large
+            new = len(blocks)
+            blocks.append(small)
+            for s in small:
+                block[s] = new
+            work.update((new, c) for c in range(k))
+    return block
+
+
+def _trim_a1(
+    C1: CompiledAutomaton, trim: bool, stats: Optional[Dict[str, int]]
+) -> Sequence[int]:
+    """
+    Live-state mask of A1 (reachable and co-reachable). Product nodes with a
+    dead A1 component can never reach an accepting pair and are skipped.
+    """
+    live1 = live_states(C1) if trim else b"\x01" * C1.num_states
+    if stats is not None:
+        stats["pruned_a1"] = C1.num_states - live1.count(1)
+        stats["visited"] = 0
+    return live1
 
 
 def inclusion_witness(A1: Dict[str, Any], A2: Dict[str, Any]) -> Optional[str]:
-    I1 = set(A1["I"])
-    F1 = set(A1["F"])
+    return inclusion_witness_compiled(compile_from_dict(A1), compile_from_dict(A2))
+
+
+def inclusion_witness_compiled(
+    C1: CompiledAutomaton,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    trim: bool = True,
+    reduce: Optional[str] = None,
+    eps_free: bool = False,
+    fast_path: bool = True,
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    """
+    A word of L(A1) rejected by A2, or None if L(A1) ⊆ L(A2). With a
+    budget, BudgetExceeded is raised once a limit is hit (unknown).
+    """
+    if eps_free:
+        # Product steps in A1 are then always synchronous symbol steps.
+        C1 = eliminate_epsilon(C1)
+    live1 = _trim_a1(C1, trim, stats)
+    if not any(live1[q1] for q1 in C1.initials):
+        # L(A1) is empty after trimming, so it is included in anything => ⊥
+        return None
+    # Determinize A2 completely first, optionally after shrinking it; a
+    # deterministic A2 is used as is (plain product).
+    with phase("determinize"):
+        spec = PreparedSpec(C2, reduce, stats=stats, fast_path=fast_path)
+        spec.determinize(budget, stats)
+    return _product_search(C1, spec, live1, stats, budget)
+
+
+def inclusion_witness_prepared(
+    C1: CompiledAutomaton,
+    spec: PreparedSpec,
+    stats: Optional[Dict[str, int]] = None,
+    trim: bool = True,
+    eps_free: bool = False,
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    """
+    inclusion_witness against a PreparedSpec: A2's DFA is shared by all
+    calls and only extended by the states this A1 reaches. stats also gets
+    new_macro_states (DFA states added by this call).
+    """
+    if eps_free:
+        C1 = eliminate_epsilon(C1)
+    live1 = _trim_a1(C1, trim, stats)
+    if not any(live1[q1] for q1 in C1.initials):
+        return None
+    before = spec.num_states
+    try:
+        return _product_search(C1, spec, live1, stats, budget)
+    finally:
+        if stats is not None:
+            stats["new_macro_states"] = spec.num_states - before
+
+
+def iter_inclusion_witnesses(
+    C1: CompiledAutomaton,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    reduce: Optional[str] = None,
+    budget: Optional[Budget] = None,
+) -> Iterator[str]:
+    """
+    Every word of L(A1) rejected by A2, shortest first and without
+    duplicates (shared.words.iter_dfa_words on pairs of macro-states of the
+    ε-free, trimmed A1 and of A2; symbols A2 does not know lead to its
+    empty macro-state). The budget is checked per pair expanded.
+    """
+    subsets1 = SubsetConstruction(eliminate_epsilon(C1))
+    subsets2 = subset_construction(C2, reduce, stats)
+    to2 = C1.symbol_map(C2)
+
+    def moves(state: Tuple[int, int]) -> Dict[int, Tuple[int, int]]:
+        s1, s2 = state
+        successors2 = subsets2.post_all(s2)
+        return {
+            a: (t1, successors2.get(to2[a], 0))
+            for a, t1 in subsets1.post_all(s1).items()
+        }
+
+    def counterexample(state: Tuple[int, int]) -> bool:
+        s1, s2 = state
+        return subsets1.is_accepting(s1) and not subsets2.is_accepting(s2)
+
+    start = (subsets1.start, subsets2.start)
+    return iter_dfa_words(C1, start, moves, counterexample, stats, budget)
+
+
+def _product_search(
+    C1: CompiledAutomaton,
+    spec: PreparedSpec,
+    live1: Sequence[int],
+    stats: Optional[Dict[str, int]],
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    F1 = C1.finals
+    n1 = C1.num_states
+    ptr1, dst1, esym1 = C1.sym_ptr, C1.sym_dst, C1.edge_sym
+    eptr1, edst1 = C1.eps_ptr, C1.eps_dst
+    to2 = C1.symbol_map(spec.automaton)
+    row_of, rejecting = spec.row, spec.rejecting
+    successor = spec.successor
+
+    # Product node (q1, S2) is encoded as id(S2) * n1 + q1; ids of newly
+    # built DFA states only extend the range.
+    start2 = spec.start
+    start_pairs: List[int] = [start2 * n1 + q1 for q1 in C1.initials if live1[q1]]
+    if any(F1[q1] and rejecting[start2] for q1 in C1.initials):
+        return ""
 
-    t1 = parse_transitions(A1["Delta"])
-    t2 = parse_transitions(A2["Delta"])
-    adj1 = build_adj(t1)
+    # Search nodes are numbered in discovery order: nodes[i] is the pair
+    # code, tree holds the predecessor columns.
+    visited: Set[int] = set(start_pairs)
+    nodes = array("q", start_pairs)
+    tree = SearchTree(len(start_pairs))
+    parent_append, symbol_append = tree.parent.append, tree.symbol.append
+    queue: deque[int] = deque(range(len(start_pairs)))
 
-    sigma = _collect_sigma(
-        list(A1.get("Sigma", [])) + list(A2.get("Sigma", [])),
-        list(t1) + list(t2),
+    try:
+        while queue:
+            index = queue.popleft()
+            if budget is not None:
+                budget.check(len(visited), spec.num_states)
+            s2, p1 = divmod(nodes[index], n1)
+            base = s2 * n1
+
+            for i in range(eptr1[p1], eptr1[p1 + 1]):
+                q1 = edst1[i]
+                nxt = base + q1
+                if live1[q1] and nxt not in visited:
+                    visited.add(nxt)
+                    new = len(nodes)
+                    nodes.append(nxt)
+                    parent_append(index)
+                    symbol_append(-1)
+                    if F1[q1] and rejecting[s2]:
+                        return tree.word(C1, new)
+                    queue.append(new)
+
+            row2 = row_of(s2)
+            for i in range(ptr1[p1], ptr1[p1 + 1]):
+                q1 = dst1[i]
+                if not live1[q1]:
+                    continue
+                a = esym1[i]
+                a2 = to2[a]
+                next_s2 = row2[a2] if a2 >= 0 else -1
+                if next_s2 < 0:
+                    next_s2 = successor(s2, a2)
+                nxt = next_s2 * n1 + q1
+                if nxt in visited:
+                    continue
+                visited.add(nxt)
+                new = len(nodes)
+                nodes.append(nxt)
+                parent_append(index)
+                symbol_append(a)
+                if F1[q1] and rejecting[next_s2]:
+                    return tree.word(C1, new)
+                queue.append(new)
+
+        return None
+    except BudgetExceeded as exc:
+        exc.add_stats(
+            stats,
+            visited=len(visited),
+            macro_states=spec.num_states,
+            frontier=len(queue),
+            depth=tree.depth(index),
+        )
+        raise
+    finally:
+        if stats is not None:
+            stats["macro_states"] = spec.num_states
+            stats["visited"] = len(visited)
+            stats["pred"] = len(tree)
+
+
+def inclusion_witness_antichain(
+    A1: Dict[str, Any], A2: Dict[str, Any]
+) -> Optional[str]:
+    """
+    On-the-fly inclusion check L(A1) ⊆ L(A2) with antichain pruning.
+
+    Macro-states of A2 are only built when the product search reaches them.
+    A pair (q1, S2) is skipped if a pair (q1, S2') with S2' ⊆ S2 has already
+    been visited: every word that leads from (q1, S2) into the complement also
+    does so from (q1, S2'), so the smaller macro-state suffices.
+
+    Returns the same contract as inclusion_witness: "" for ε, a word, or None.
+    """
+    return inclusion_witness_antichain_compiled(
+        compile_from_dict(A1), compile_from_dict(A2)
     )
 
-    start2, det2, F2 = _determinize_with_epsilon(A2["I"], A2["F"], t2, sigma)
-
-    def is_complement_final(state2: FrozenSet[Any]) -> bool:
-        return not any(q in F2 for q in state2)
 
-    def is_accepting(state1: Any, state2: FrozenSet[Any]) -> bool:
-        return state1 in F1 and is_complement_final(state2)
-
-    start_pairs: Set[Tuple[Any, FrozenSet[Any]]] = {(q1, start2) for q1 in I1}
+def inclusion_witness_antichain_compiled(
+    C1: CompiledAutomaton,
+    C2: CompiledAutomaton,
+    stats: Optional[Dict[str, int]] = None,
+    trim: bool = True,
+    reduce: Optional[str] = None,
+    eps_free: bool = False,
+    fast_path: bool = True,
+    budget: Optional[Budget] = None,
+) -> Optional[str]:
+    deterministic = is_deterministic(C2)
+    if deterministic and fast_path:
+        # Macro-states would be singletons, so there is nothing to prune.
+        return inclusion_witness_compiled(
+            C1, C2, stats, trim, eps_free=eps_free, budget=budget
+        )
+    if stats is not None:
+        stats["deterministic"] = int(deterministic)
+        stats["fast_path"] = 0
+    if eps_free:
+        C1 = eliminate_epsilon(C1)
+    F1 = C1.finals
+    ptr1, dst1, esym1 = C1.sym_ptr, C1.sym_dst, C1.edge_sym
+    eptr1, edst1 = C1.eps_ptr, C1.eps_dst
+    to2 = C1.symbol_map(C2)
+
+    live1 = _trim_a1(C1, trim, stats)
+    if not any(live1[q1] for q1 in C1.initials):
+        # L(A1) is empty after trimming, so it is included in anything => ⊥
+        return None
+
+    # Macro-states of A2 are int bitsets; ∅ is 0.
+    subsets2 = subset_construction(C2, reduce, stats)
+    start2 = subsets2.start
+    post_cache: Dict[Tuple[int, int], int] = {}
+    macro_states: Set[int] = {start2}
+
+    def post(state2: int, a2: int) -> int:
+        if a2 < 0:
+            return 0
+        key = (state2, a2)
+        nxt = post_cache.get(key)
+        if nxt is None:
+            nxt = subsets2.post(state2, a2)
+            post_cache[key] = nxt
+            macro_states.add(nxt)
+        return nxt
+
+    def is_accepting(state1: int, state2: int) -> bool:
+        return bool(F1[state1]) and not subsets2.is_accepting(state2)
+
+    I1 = [q1 for q1 in C1.initials if live1[q1]]
     if any(is_accepting(q1, start2) for q1 in I1):
         return ""
 
-    queue: deque[Tuple[Any, FrozenSet[Any]]] = deque(start_pairs)
-    visited: Set[Tuple[Any, FrozenSet[Any]]] = set(start_pairs)
-    pred: Dict[
-        Tuple[Any, FrozenSet[Any]],
-        Tuple[Tuple[Any, FrozenSet[Any]], Optional[str]],
-    ] = {}
-
-    def reconstruct(end_pair: Tuple[Any, FrozenSet[Any]]) -> str:
-        symbols: List[str] = []
-        cur = end_pair
-        while cur in pred:
-            prev, sym = pred[cur]
-            if sym is not None:
-                symbols.append(sym)
-            cur = prev
-        symbols.reverse()
-        return "".join(symbols)
-
-    while queue:
-        p1, s2 = queue.popleft()
-
-        for sym, q1 in adj1.get(p1, []):
-            if sym is None:
-                nxt = (q1, s2)
-                if nxt not in visited:
-                    visited.add(nxt)
-                    pred[nxt] = ((p1, s2), None)
-                    if is_accepting(q1, s2):
-                        return reconstruct(nxt)
-                    queue.append(nxt)
+    # antichain[q1] holds the ⊆-minimal macro-states visited together with q1.
+    antichain: Dict[int, Set[int]] = {q1: {start2} for q1 in I1}
+    # Pairs are numbered in discovery order: (nodes1[i], nodes2[i]).
+    nodes1 = array("i", I1)
+    nodes2: List[int] = [start2] * len(I1)
+    tree = SearchTree(len(I1))
+    queue: deque[int] = deque(range(len(I1)))
+
+    def insert(q1: int, state2: int) -> bool:
+        chain = antichain.setdefault(q1, set())
+        # other ⊆ state2 iff other has no bit outside state2.
+        if any(other & ~state2 == 0 for other in chain):
+            return False
+        dominated = [other for other in chain if state2 & ~other == 0]
+        chain.difference_update(dominated)
+        chain.add(state2)
+        return True
 
-        for sym, q1 in adj1.get(p1, []):
-            if sym is None:
-                continue
-            next_s2 = det2.get(s2, {}).get(sym)
-            if next_s2 is None:
-                continue
-            nxt = (q1, next_s2)
-            if nxt in visited:
+    try:
+        while queue:
+            index = queue.popleft()
+            p1, s2 = nodes1[index], nodes2[index]
+            if s2 not in antichain[p1]:
+                # Evicted by a smaller macro-state that is already queued.
                 continue
-            visited.add(nxt)
-            pred[nxt] = ((p1, s2), sym)
-            if is_accepting(q1, next_s2):
-                return reconstruct(nxt)
-            queue.append(nxt)
-
-    return None
+            if budget is not None:
+                budget.check(len(tree), len(macro_states))
+
+            successors: List[Tuple[int, int, int]] = [
+                (edst1[i], s2, -1)
+                for i in range(eptr1[p1], eptr1[p1 + 1])
+                if live1[edst1[i]]
+            ]
+            for i in range(ptr1[p1], ptr1[p1 + 1]):
+                if live1[dst1[i]]:
+                    a = esym1[i]
+                    successors.append((dst1[i], post(s2, to2[a]), a))
+
+            for q1, next_s2, a in successors:
+                if not insert(q1, next_s2):
+                    continue
+                nodes1.append(q1)
+                nodes2.append(next_s2)
+                nxt = tree.add(index, a)
+                if is_accepting(q1, next_s2):
+                    return tree.word(C1, nxt)
+                queue.append(nxt)
+
+        return None
+    except BudgetExceeded as exc:
+        exc.add_stats(
+            stats,
+            visited=len(tree),
+            macro_states=len(macro_states),
+            frontier=len(queue),
+            depth=tree.depth(index),
+        )
+        raise
+    finally:
+        if stats is not None:
+            stats["macro_states"] = len(macro_states)
+            stats["visited"] = len(tree)
+            stats["pred"] = len(tree)
 
 
 def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
@@ -171,6 +604,108 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
         action="store_true",
         help="Run a small demo pair instead of reading input.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the JSON input straight into the compiled automaton "
+        "(lower peak memory for very large Delta lists).",
+    )
+    parser.add_argument(
+        "--a1",
+        help="Automaton file (JSON or compiled binary) for A1; use with --a2 "
+        "instead of a pair file.",
+    )
+    parser.add_argument(
+        "--a2",
+        help="Automaton file (JSON or compiled binary) for A2.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep compiled binary copies of the JSON input (keyed by its "
+        "SHA-256) and map them instead of parsing on later runs.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("subset", "antichain"),
+        default="subset",
+        help="subset: determinize A2 completely first; "
+        "antichain: build A2 macro-states on the fly with subsumption pruning.",
+    )
+    parser.add_argument(
+        "--reduce",
+        choices=REDUCTIONS,
+        help="Shrink A2 before determinization: ε-elimination and "
+        "bisimulation quotient (bisim), plus simulation quotient and "
+        "macro-state pruning (sim).",
+    )
+    parser.add_argument(
+        "--many",
+        metavar="SOURCE",
+        help="Check many A1 against one --a2: SOURCE is a directory of "
+        "automaton files or an NDJSON file ('-' for stdin) of automata or "
+        "{\"id\": ..., \"A1\": automaton or path} records. A2's DFA is built "
+        "once and reused; one NDJSON result line per A1.",
+    )
+    parser.add_argument(
+        "--minimize",
+        action="store_true",
+        help="With --many: determinize A2 completely and minimize it "
+        "(Hopcroft) up front instead of extending it lazily.",
+    )
+    parser.add_argument(
+        "--eps-free",
+        action="store_true",
+        help="Remove A1's ε-edges (ε-closures folded into symbol edges) before "
+        "the product search.",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Use the subset construction even if A2 is deterministic.",
+    )
+    parser.add_argument(
+        "--words",
+        type=int,
+        metavar="K",
+        help="Stream the first K counterexamples (shortest first, no duplicates) "
+        "as NDJSON lines instead of a single witness.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print phase times and search counters as one JSON object to stderr "
+        "(with --many: a \"stats\" field in every result line).",
+    )
+    parser.add_argument(
+        "--stats-memory",
+        action="store_true",
+        help="Like --stats, plus the tracemalloc peak (peak_bytes; slower).",
+    )
+    parser.add_argument(
+        "--max-states",
+        type=int,
+        help="Give up (result unknown, exit code 3) after this many search nodes "
+        "(DFA states of A2 while determinizing, then product pairs).",
+    )
+    parser.add_argument(
+        "--max-macro-states",
+        type=int,
+        help="Give up (result unknown, exit code 3) after this many DFA states of A2.",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="Give up (result unknown, exit code 3) after this much wall time "
+        "(per A1 with --many).",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        metavar="MB",
+        help="Give up (result unknown, exit code 3) once the process RSS "
+        "exceeds this many MiB.",
+    )
     return parser.parse_args(argv)
 
 
@@ -194,28 +729,126 @@ def _demo_automata() -> Tuple[Dict[str, Any], Dict[str, Any]]:
     return A1, A2
 
 
-def _load_automata(args: argparse.Namespace) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def _load_automata(
+    args: argparse.Namespace,
+) -> Tuple[CompiledAutomaton, CompiledAutomaton]:
     if args.demo:
-        return _demo_automata()
-    if args.file:
-        data = read_json_input(args.file)
-        return data["A1"], data["A2"]
-    if args.pair:
-        data = read_json_input(args.pair)
-        return data["A1"], data["A2"]
-    data = read_json_input(None)
-    return data["A1"], data["A2"]
+        A1, A2 = _demo_automata()
+        return compile_from_dict(A1), compile_from_dict(A2)
+    return load_input_pair(
+        args.file or args.pair, args.a1, args.a2, stream=args.stream, cache=args.cache
+    )
+
+
+def _run_many(args: argparse.Namespace) -> int:
+    """
+    --many: one NDJSON line per A1; exit code 1 if any A1 failed, else 3
+    if a budget left any A1 unknown.
+    """
+    if not args.a2:
+        print("Input error: --many needs --a2.", file=sys.stderr)
+        return 2
+    try:
+        spec = PreparedSpec(
+            load_input(args.a2, args.stream, args.cache),
+            args.reduce,
+            minimize=args.minimize,
+            fast_path=not args.no_fast_path,
+        )
+    except (KeyError, ValueError, OSError) as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    failed = unknown = 0
+    try:
+        # Records are loaded one by one (errors go into their line); only
+        # opening or reading SOURCE itself ends the run.
+        for a1_id, load in iter_automata(args.many, "A1", args.stream, args.cache):
+            record: Dict[str, Any] = {"id": a1_id}
+            prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
+            try:
+                with prof or contextlib.nullcontext():
+                    with phase("load"):
+                        A1 = load()
+                    with phase("solve"):
+                        witness = inclusion_witness_prepared(
+                            A1,
+                            spec,
+                            prof.counters if prof else None,
+                            eps_free=args.eps_free,
+                            budget=Budget.from_args(args),
+                        )
+                record.update(witness=witness, result=format_witness(witness))
+                if prof:
+                    prof.add_closure_stats([A1])
+                    record["stats"] = prof.as_dict()
+            except (KeyError, ValueError, OSError) as exc:
+                failed += 1
+                record["error"] = f"{type(exc).__name__}: {exc}"
+            except BudgetExceeded as exc:
+                unknown += 1
+                record.update(result="unknown", budget=str(exc), partial=exc.stats)
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    except OSError as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    if failed:
+        return 1
+    return EXIT_BUDGET if unknown else 0
 
 
 def main(argv: Sequence[str]) -> int:
     args = _parse_args(argv)
+    if args.many:
+        if args.words is not None:
+            print("Input error: --words cannot be combined with --many.", file=sys.stderr)
+            return 2
+        return _run_many(args)
+    prof = Profile(args.stats_memory) if args.stats or args.stats_memory else None
+    solve = (
+        inclusion_witness_antichain_compiled
+        if args.mode == "antichain"
+        else inclusion_witness_compiled
+    )
     try:
-        A1, A2 = _load_automata(args)
-        witness = inclusion_witness(A1, A2)
+        with prof or contextlib.nullcontext():
+            with phase("load"):
+                A1, A2 = _load_automata(args)
+            with phase("solve"):
+                if args.words is not None:
+                    words = iter_inclusion_witnesses(
+                        A1,
+                        A2,
+                        prof.counters if prof else None,
+                        reduce=args.reduce,
+                        budget=Budget.from_args(args),
+                    )
+                    with contextlib.closing(words):
+                        print_words(words, args.words)
+                else:
+                    witness = solve(
+                        A1,
+                        A2,
+                        prof.counters if prof else None,
+                        reduce=args.reduce,
+                        eps_free=args.eps_free,
+                        fast_path=not args.no_fast_path,
+                        budget=Budget.from_args(args),
+                    )
     except (KeyError, ValueError) as exc:
         print(f"Input error: {exc}", file=sys.stderr)
         return 2
-    print(format_witness(witness))
+    except BudgetExceeded as exc:
+        if args.words is None:
+            print("unknown")
+        print(f"Budget exceeded: {exc} {json.dumps(exc.stats, sort_keys=True)}", file=sys.stderr)
+        if prof:
+            print_stats(prof.as_dict())
+        return EXIT_BUDGET
+    if args.words is None:
+        print(format_witness(witness))
+    if prof:
+        prof.add_closure_stats([A1, A2])
+        print_stats(prof.as_dict())
     return 0
 
 
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import signal
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
+
+from B1.b1 import find_witness_bidirectional, find_witness_compiled, find_witness_levels
+from B2.b2 import find_witness_for_complement_antichain, find_witness_for_complement_compiled
+from B3.b3 import intersection_witness_compiled
+from B4.b4 import inclusion_witness_antichain_compiled, inclusion_witness_compiled
+from shared.automaton_common import format_witness
+from shared.binary import load_file
+from shared.compiled import CompiledAutomaton, compile_from_dict
+from shared.result_cache import ResultCache, result_key
+
+# op -> names of the automata the job must provide
+OPS: Dict[str, Tuple[str, ...]] = {
+    "emptiness": ("A",),
+    "complement": ("A",),
+    "intersection": ("A1", "A2"),
+    "inclusion": ("A1", "A2"),
+}
+
+
+def _automaton(value: Any, cache: bool = False) -> CompiledAutomaton:
+    """An inline automaton object, or a path to a JSON/binary automaton file."""
+    if isinstance(value, str):
+        return load_file(value, cache)
+    return compile_from_dict(value)
+
+
+def parse_job(
+    job: Dict[str, Any], cache: bool = False
+) -> Tuple[str, Tuple[CompiledAutomaton, ...], Optional[str]]:
+    """
+    Validate one job record and compile its automata.
+
+    Single-automaton jobs may give the automaton under "A" or inline
+    (Q, Sigma, I, F, Delta next to "op"). Instead of an object, an automaton
+    may be given as a file path; every job naming the same file shares the
+    loaded automaton. With cache=True JSON files are read through the binary
+    cache and mapped.
+    Returns (op, automata, mode).
+    """
+    if not isinstance(job, dict):
+        raise ValueError("Job must be a JSON object.")
+    op = job.get("op")
+    if op not in OPS:
+        raise ValueError(f"Unknown op {op!r}; expected one of {', '.join(OPS)}.")
+    names = OPS[op]
+    if names == ("A",) and "A" not in job:
+        automata = (compile_from_dict(job),)
+    else:
+        automata = tuple(_automaton(job[name], cache) for name in names)
+    return op, automata, job.get("mode")
+
+
+def solve(
+    op: str, automata: Sequence[CompiledAutomaton], mode: Optional[str] = None
+) -> Optional[str]:
+    if op == "emptiness":
+        if mode == "bidirectional":
+            return find_witness_bidirectional(automata[0])
+        if mode == "levels":
+            return find_witness_levels(automata[0])
+        return find_witness_compiled(automata[0])
+    if op == "complement":
+        if mode == "antichain":
+            return find_witness_for_complement_antichain(automata[0])
+        return find_witness_for_complement_compiled(automata[0])
+    if op == "intersection":
+        return intersection_witness_compiled(automata[0], automata[1])
+    if op == "inclusion":
+        if mode == "antichain":
+            return inclusion_witness_antichain_compiled(automata[0], automata[1])
+        return inclusion_witness_compiled(automata[0], automata[1])
+    raise ValueError(f"Unknown op {op!r}.")
+
+
+# Per-process result cache, set by open_result_cache (also the pool initializer).
+_result_cache: Optional[ResultCache] = None
+
+
+def open_result_cache(path: Optional[str], max_entries: int = 100_000) -> ResultCache:
+    """Route solve_job through a ResultCache on path (None: memory only)."""
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = ResultCache(path, max_entries)
+    return _result_cache
+
+
+def solve_cached(
+    op: str, automata: Sequence[CompiledAutomaton], mode: Optional[str] = None
+) -> Tuple[Optional[str], Optional[bool]]:
+    """solve through the open result cache; returns (witness, hit or None)."""
+    cache = _result_cache
+    if cache is None:
+        return solve(op, automata, mode), None
+    return cache.cached(result_key(op, automata, mode), lambda: solve(op, automata, mode))
+
+
+def result_record(
+    index: int, job_id: Any, op: Optional[str], witness: Optional[str]
+) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "id": job_id,
+        "op": op,
+        "witness": witness,
+        "result": format_witness(witness),
+    }
+
+
+def error_record(
+    index: int, job_id: Any, op: Optional[str], exc: BaseException
+) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "id": job_id,
+        "op": op,
+        "error": f"{type(exc).__name__}: {exc}",
+    }
+
+
+class Job(NamedTuple):
+    """A parsed job whose automata are already compiled (cheap to pickle)."""
+
+    index: int
+    id: Any
+    op: str
+    automata: Tuple[CompiledAutomaton, ...]
+    mode: Optional[str]
+
+
+class JobTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def time_limit(seconds: Optional[float]) -> Iterator[None]:
+    """Raise JobTimeout in the current (main) thread after seconds of wall time."""
+    if not seconds or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def _expire(signum: int, frame: Any) -> None:
+        raise JobTimeout(f"job exceeded {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def prepare_job(index: int, line: str, cache: bool = False) -> Union[Job, Dict[str, Any]]:
+    """Parse and compile one NDJSON line, or return its error record."""
+    job: Any = None
+    try:
+        job = json.loads(line)
+        op, automata, mode = parse_job(job, cache)
+        return Job(index, job.get("id"), op, automata, mode)
+    except Exception as exc:  # a bad record must not stop the batch
+        job_id = job.get("id") if isinstance(job, dict) else None
+        op = job.get("op") if isinstance(job, dict) else None
+        return error_record(index, job_id, op, exc)
+
+
+def solve_job(job: Job, timeout: Optional[float] = None) -> Dict[str, Any]:
+    try:
+        with time_limit(timeout):
+            witness, hit = solve_cached(job.op, job.automata, job.mode)
+        record = result_record(job.index, job.id, job.op, witness)
+        if hit is not None:
+            record["cached"] = hit
+        return record
+    except Exception as exc:
+        return error_record(job.index, job.id, job.op, exc)
+
+
+def run_job(
+    index: int, line: str, timeout: Optional[float] = None, cache: bool = False
+) -> Dict[str, Any]:
+    """Solve one NDJSON line; any failure is reported in the returned record."""
+    job = prepare_job(index, line, cache)
+    if isinstance(job, Job):
+        return solve_job(job, timeout)
+    return job
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from batch.jobs import Job, error_record, open_result_cache, prepare_job, solve_job
+
+# A chunk item is either a compiled job or the error record of a line that
+# could not be parsed; errors travel with their chunk to keep output order.
+ChunkItem = Union[Job, Dict[str, Any]]
+
+
+def _solve_chunk(chunk: List[ChunkItem], timeout: Optional[float]) -> List[Dict[str, Any]]:
+    """Worker entry point: solve every job of one chunk in order."""
+    return [
+        solve_job(item, timeout) if isinstance(item, Job) else item for item in chunk
+    ]
+
+
+def _chunks(
+    lines: Iterable[Tuple[int, str]], chunk_size: int, cache: bool = False
+) -> Iterator[List[ChunkItem]]:
+    chunk: List[ChunkItem] = []
+    for index, line in lines:
+        chunk.append(prepare_job(index, line, cache))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _chunk_failed(chunk: List[ChunkItem], exc: BaseException) -> List[Dict[str, Any]]:
+    """Records for a chunk whose worker process died."""
+    records = []
+    for item in chunk:
+        if isinstance(item, Job):
+            records.append(error_record(item.index, item.id, item.op, exc))
+        else:
+            records.append(item)
+    return records
+
+
+def run_parallel(
+    lines: Iterable[Tuple[int, str]],
+    workers: int,
+    chunk_size: int = 16,
+    ordered: bool = True,
+    timeout: Optional[float] = None,
+    result_cache: Optional[str] = None,
+    cache: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Solve NDJSON jobs on a process pool and yield one record per job.
+
+    Lines are parsed and compiled in the calling process, so workers receive
+    compact CompiledAutomaton objects instead of JSON. At most 4 chunks per
+    worker are in flight, which keeps memory bounded on long input streams.
+    With ordered=False records are yielded as soon as their chunk finishes.
+    timeout is a per-job wall-clock limit enforced inside the worker.
+    With result_cache every worker opens that SQLite result cache; cache=True
+    reads JSON file paths through the binary cache.
+    If a worker process dies, every chunk still running on that pool gets
+    error records; the pool is then replaced and the batch continues.
+    """
+    max_pending = 4 * workers
+    chunks = _chunks(lines, chunk_size, cache)
+    pool_args: Dict[str, Any] = {}
+    if result_cache:
+        pool_args = {"initializer": open_result_cache, "initargs": (result_cache,)}
+    executor = ProcessPoolExecutor(max_workers=workers, **pool_args)
+    # Submission order (ordered mode) and the set of unfinished futures.
+    pending: Deque[Future] = deque()
+    running: Set[Future] = set()
+    owner: Dict[Future, List[ChunkItem]] = {}
+    exhausted = False
+
+    def submit(chunk: List[ChunkItem]) -> Future:
+        nonlocal executor
+        try:
+            return executor.submit(_solve_chunk, chunk, timeout)
+        except BrokenProcessPool:
+            # A worker died since the last submit; the futures already on the
+            # old pool fail on their own and are reported by collect().
+            executor.shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers, **pool_args)
+            return executor.submit(_solve_chunk, chunk, timeout)
+
+    def fill() -> bool:
+        while len(owner) < max_pending:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return True
+            future = submit(chunk)
+            owner[future] = chunk
+            if ordered:
+                pending.append(future)
+            else:
+                running.add(future)
+        return False
+
+    def collect(future: Future) -> List[Dict[str, Any]]:
+        chunk = owner.pop(future)
+        try:
+            return future.result()
+        except Exception as exc:
+            return _chunk_failed(chunk, exc)
+
+    try:
+        while True:
+            if not exhausted:
+                exhausted = fill()
+            if not owner:
+                break
+            if ordered:
+                yield from collect(pending.popleft())
+            else:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.discard(future)
+                    yield from collect(future)
+    finally:
+        executor.shutdown()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, TextIO, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from batch.jobs import open_result_cache, run_job
+from batch.parallel import run_parallel
+
+
+def iter_lines(stream: TextIO) -> Iterator[Tuple[int, str]]:
+    """Yield (job index, line) for every non-blank line of an NDJSON stream."""
+    index = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        yield index, line
+        index += 1
+
+
+def write_records(
+    records: Iterable[Dict[str, Any]], out: TextIO, counts: Optional[Dict[str, int]] = None
+) -> int:
+    """Stream records as NDJSON; returns the number of failed jobs."""
+    failed = 0
+    for record in records:
+        if "error" in record:
+            failed += 1
+        if counts is not None and "cached" in record:
+            counts["hits" if record["cached"] else "misses"] += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+    return failed
+
+
+def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Solve many emptiness/complement/intersection/inclusion "
+        "jobs given as newline-delimited JSON."
+    )
+    parser.add_argument(
+        "-f",
+        "--file",
+        help="Read NDJSON jobs from file; otherwise read from stdin.",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (default 1: solve in this process).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=16,
+        help="Jobs per task sent to a worker process (default 16).",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Emit results as soon as they are ready instead of in input order.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Per-job wall-clock limit in seconds; exceeded jobs report an error.",
+    )
+    parser.add_argument(
+        "--result-cache",
+        metavar="DB",
+        help="SQLite file caching results by canonical automaton hash; "
+        "records get a \"cached\" flag and a hit summary goes to stderr.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Read JSON automata given as file paths through the binary cache "
+        "(a compiled copy keyed by SHA-256, mapped on later runs).",
+    )
+    return parser.parse_args(argv)
+
+
+def _records(args: argparse.Namespace, stream: TextIO) -> Iterator[Dict[str, Any]]:
+    lines = iter_lines(stream)
+    if args.workers > 1:
+        return run_parallel(
+            lines,
+            workers=args.workers,
+            chunk_size=max(1, args.chunk_size),
+            ordered=not args.unordered,
+            timeout=args.timeout,
+            result_cache=args.result_cache,
+            cache=args.cache,
+        )
+    if args.result_cache:
+        open_result_cache(args.result_cache)
+    return (run_job(i, line, args.timeout, args.cache) for i, line in lines)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = _parse_args(argv)
+    counts = {"hits": 0, "misses": 0} if args.result_cache else None
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as stream:
+            failed = write_records(_records(args, stream), sys.stdout, counts)
+    else:
+        failed = write_records(_records(args, sys.stdin), sys.stdout, counts)
+    if counts is not None:
+        print(
+            f"result cache: {counts['hits']} hits, {counts['misses']} misses",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
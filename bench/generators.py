@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Parameterized automaton families for the benchmarks.
+
+Every generator returns plain automaton dicts in the JSON input format
+(Q, Sigma, I, F, Delta as triples), or {"A1": ..., "A2": ...} pairs, so the
+results can also be dumped and fed to the CLIs. Random families are
+deterministic for a given seed.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List
+
+Automaton = Dict[str, Any]
+
+
+def alphabet(k: int) -> List[str]:
+    """The first k symbols: a, b, ..., z, then s26, s27, ..."""
+    return [chr(ord("a") + i) if i < 26 else f"s{i}" for i in range(k)]
+
+
+def random_nfa(
+    n: int,
+    k: int = 2,
+    density: float = 1.5,
+    eps: float = 0.0,
+    seed: int = 0,
+    prefix: str = "q",
+    finals: float = 0.0,
+) -> Automaton:
+    """
+    Random NFA with n states over k symbols.
+
+    density is the expected number of edges per (state, symbol), eps the
+    expected number of ε-edges per state. q0 is initial; q{n-1} is final and
+    every other state is final with probability finals.
+    """
+    rng = random.Random(seed)
+    sigma = alphabet(k)
+    states = [f"{prefix}{i}" for i in range(n)]
+    delta: List[List[Any]] = [
+        [states[rng.randrange(n)], rng.choice(sigma), states[rng.randrange(n)]]
+        for _ in range(int(n * k * density))
+    ]
+    delta.extend(
+        [states[rng.randrange(n)], "ε", states[rng.randrange(n)]]
+        for _ in range(int(n * eps))
+    )
+    F = [q for q in states[:-1] if rng.random() < finals] + [states[-1]]
+    return {"Q": states, "Sigma": sigma, "I": [states[0]], "F": F, "Delta": delta}
+
+
+def random_dfa(n: int, k: int = 2, seed: int = 0, prefix: str = "d") -> Automaton:
+    """
+    Random complete DFA with n states over k symbols in which every state is
+    final (universal): a complement search has to visit every reachable
+    state before it can answer ⊥.
+    """
+    rng = random.Random(seed)
+    sigma = alphabet(k)
+    states = [f"{prefix}{i}" for i in range(n)]
+    delta = [[q, a, states[rng.randrange(n)]] for q in states for a in sigma]
+    return {"Q": states, "Sigma": sigma, "I": [states[0]], "F": list(states), "Delta": delta}
+
+
+def eps_chain(n: int, stride: int = 8, prefix: str = "e") -> Automaton:
+    """
+    ε-heavy chain of n states: consecutive states are joined by ε-edges,
+    except every stride-th step, which reads "a". Every stride-th state also
+    has an ε-edge back by stride // 2 states, so the ε-graph has cycles.
+    The only witness is a^(n // stride) (roughly).
+    """
+    states = [f"{prefix}{i}" for i in range(n)]
+    delta: List[List[Any]] = []
+    for i in range(n - 1):
+        sym = "a" if i % stride == stride - 1 else "ε"
+        delta.append([states[i], sym, states[i + 1]])
+        if i % stride == 0 and i >= stride // 2:
+            delta.append([states[i], "ε", states[i - stride // 2]])
+    return {"Q": states, "Sigma": ["a", "b"], "I": [states[0]], "F": [states[-1]], "Delta": delta}
+
+
+def nth_from_end(n: int, prefix: str = "p") -> Automaton:
+    """NFA for (a|b)* a (a|b)^(n-1); its minimal DFA has 2^n states."""
+    states = [f"{prefix}{i}" for i in range(n + 1)]
+    delta: List[List[Any]] = [
+        [states[0], "a", states[0]],
+        [states[0], "b", states[0]],
+        [states[0], "a", states[1]],
+    ]
+    for i in range(1, n):
+        delta.append([states[i], "a", states[i + 1]])
+        delta.append([states[i], "b", states[i + 1]])
+    return {"Q": states, "Sigma": ["a", "b"], "I": [states[0]], "F": [states[n]], "Delta": delta}
+
+
+def universal_nth(n: int) -> Automaton:
+    """
+    Universal NFA that hides it: words shorter than n are accepted by a
+    chain s0..s{n-1}, longer ones because their n-th letter from the end is
+    an a (chain a1..an) or a b (chain b1..bn). The complement is empty, but
+    the subset construction reaches about 2^n macro-states first.
+    """
+    delta: List[List[Any]] = [["0", "a", "0"], ["0", "b", "0"], ["0", "a", "a1"], ["0", "b", "b1"]]
+    for c in "ab":
+        for i in range(1, n):
+            delta.append([f"{c}{i}", "a", f"{c}{i + 1}"])
+            delta.append([f"{c}{i}", "b", f"{c}{i + 1}"])
+    for i in range(n - 1):
+        delta.append([f"s{i}", "a", f"s{i + 1}"])
+        delta.append([f"s{i}", "b", f"s{i + 1}"])
+    short = [f"s{i}" for i in range(n)]
+    states = ["0"] + [f"{c}{i}" for c in "ab" for i in range(1, n + 1)] + short
+    return {
+        "Q": states,
+        "Sigma": ["a", "b"],
+        "I": ["0", "s0"],
+        "F": [f"a{n}", f"b{n}"] + short,
+        "Delta": delta,
+    }
+
+
+
+def universal_counting(n: int, m: int) -> Automaton:
+    """
+    universal_nth(n) plus non-final states c0..cm that count the a's read
+    (capped at m). They do not change the language, but every macro-state
+    of universal_nth now also appears with up to m + 1 counter prefixes,
+    each a subset of the next: the antichain search keeps only the smallest.
+    """
+    automaton = universal_nth(n)
+    counter = [f"c{j}" for j in range(m + 1)]
+    for j, state in enumerate(counter):
+        automaton["Delta"].append([state, "b", state])
+        automaton["Delta"].append([state, "a", state])
+        if j < m:
+            automaton["Delta"].append([state, "a", counter[j + 1]])
+    automaton["Q"] = automaton["Q"] + counter
+    automaton["I"] = automaton["I"] + ["c0"]
+    return automaton
+
+
+def nth_pair(n: int) -> Dict[str, Automaton]:
+    """Two copies of nth_from_end(n): inclusion holds, A2 determinizes to 2^n."""
+    return {"A1": nth_from_end(n, "p"), "A2": nth_from_end(n, "q")}
+
+
+def counter_pair(p: int, q: int, k: int = 2) -> Dict[str, Automaton]:
+    """
+    Modulo counters over k symbols: A1 accepts lengths ≡ 0 (mod p), A2
+    lengths ≡ 1 (mod q). For coprime p, q the product BFS visits about p*q
+    pairs before the shortest common word is found.
+    """
+    sigma = alphabet(k)
+
+    def counter(m: int, final: int, prefix: str) -> Automaton:
+        states = [f"{prefix}{i}" for i in range(m)]
+        delta = [[states[i], a, states[(i + 1) % m]] for i in range(m) for a in sigma]
+        return {"Q": states, "Sigma": sigma, "I": [states[0]], "F": [states[final % m]], "Delta": delta}
+
+    return {"A1": counter(p, 0, "c"), "A2": counter(q, 1, "d")}
+
+
+def random_pair(
+    n: int, k: int = 2, density: float = 1.5, eps: float = 0.0, seed: int = 0
+) -> Dict[str, Automaton]:
+    """Two independent random NFAs of n states (seeds seed and seed + 1)."""
+    return {
+        "A1": random_nfa(n, k, density, eps, seed, "q"),
+        "A2": random_nfa(n, k, density, eps, seed + 1, "r"),
+    }
+
+
+def eps_pair(n: int, stride: int = 8) -> Dict[str, Automaton]:
+    """
+    Two ε-heavy chains (eps_chain) with strides stride and stride + 1. Both
+    read a only every few states and are joined by ε-edges otherwise, so
+    almost every product pair exists only to thread an ε-path.
+    """
+    return {"A1": eps_chain(n, stride, "e"), "A2": eps_chain(n, stride + 1, "f")}
+
+
+def dfa_pair(
+    n: int, m: int, k: int = 2, density: float = 1.5, seed: int = 0
+) -> Dict[str, Automaton]:
+    """random_nfa(n) against the universal random_dfa(m): inclusion holds."""
+    return {"A1": random_nfa(n, k, density, 0.0, seed, "q"), "A2": random_dfa(m, k, seed + 1)}
+
+
+def dead_pair(n: int, k: int = 2, density: float = 1.5, seed: int = 0) -> Dict[str, Automaton]:
+    """
+    random_pair whose final states are cut off: every edge into q{n-1} now
+    starts in an extra unreachable state. The intersection is empty and all
+    reachable states are dead, so an untrimmed product search explores
+    every reachable pair for nothing.
+    """
+    pair = random_pair(n, k, density, 0.0, seed)
+    for A in pair.values():
+        final = A["F"][-1]
+        orphan = f"{final}_in"
+        A["Q"].append(orphan)
+        A["Delta"] = [[orphan if q == final else p, a, q] for p, a, q in A["Delta"]]
+    return pair
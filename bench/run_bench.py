@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import functools
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from B1.b1 import find_witness_bidirectional, find_witness_compiled, find_witness_levels
+from B2.b2 import find_witness_for_complement_antichain, find_witness_for_complement_compiled
+from B3.b3 import intersection_witness_compiled
+from B4.b4 import inclusion_witness_antichain_compiled, inclusion_witness_compiled
+from bench import generators
+from shared.compiled import CompiledAutomaton, compile_from_dict
+
+# solver name -> compiled solver (takes the automata and an optional stats dict)
+SOLVERS: Dict[str, Callable[..., Optional[str]]] = {
+    "B1": find_witness_compiled,
+    "B1-bidirectional": find_witness_bidirectional,
+    "B1-levels": find_witness_levels,
+    "B2": find_witness_for_complement_compiled,
+    "B2-bisim": functools.partial(find_witness_for_complement_compiled, reduce="bisim"),
+    "B2-sim": functools.partial(find_witness_for_complement_compiled, reduce="sim"),
+    "B2-subset": functools.partial(find_witness_for_complement_compiled, fast_path=False),
+    "B2-antichain": find_witness_for_complement_antichain,
+    "B3": intersection_witness_compiled,
+    "B3-epsfree": functools.partial(intersection_witness_compiled, eps_free=True),
+    "B4": inclusion_witness_compiled,
+    "B4-antichain": inclusion_witness_antichain_compiled,
+    "B4-bisim": functools.partial(inclusion_witness_compiled, reduce="bisim"),
+    "B4-epsfree": functools.partial(inclusion_witness_compiled, eps_free=True),
+    "B4-subset": functools.partial(inclusion_witness_compiled, fast_path=False),
+}
+
+
+class Case(NamedTuple):
+    solver: str
+    family: str
+    params: Dict[str, Any]
+
+
+# family -> generator; pair families return {"A1": ..., "A2": ...}
+FAMILIES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "random": generators.random_nfa,
+    "eps_chain": generators.eps_chain,
+    "universal_nth": generators.universal_nth,
+    "universal_counting": generators.universal_counting,
+    "nth_pair": generators.nth_pair,
+    "counter_pair": generators.counter_pair,
+    "random_pair": generators.random_pair,
+    "dead_pair": generators.dead_pair,
+    "eps_pair": generators.eps_pair,
+    "random_dfa": generators.random_dfa,
+    "dfa_pair": generators.dfa_pair,
+}
+
+
+def suite(quick: bool = False) -> List[Case]:
+    """The default benchmark matrix; quick=True keeps every case well below a second."""
+    cases: List[Case] = []
+    for n in (1000, 10000) if quick else (1000, 10000, 100000):
+        for solver in ("B1", "B1-bidirectional", "B1-levels"):
+            cases.append(Case(solver, "random", {"n": n, "k": 4, "density": 0.5, "eps": 0.2}))
+            cases.append(Case(solver, "eps_chain", {"n": n}))
+    # Large alphabet, few edges per state: stresses building the CSR index.
+    for n in (10000,) if quick else (10000, 100000):
+        cases.append(Case("B1", "random", {"n": n, "k": 500, "density": 0.006}))
+    for n in (6, 8) if quick else (8, 10, 12):
+        for solver in ("B2", "B2-antichain", "B2-bisim", "B2-sim"):
+            cases.append(Case(solver, "universal_nth", {"n": n}))
+    for n, m in ((6, 20), (8, 20)) if quick else ((8, 20), (8, 40), (10, 30)):
+        for solver in ("B2", "B2-antichain"):
+            cases.append(Case(solver, "universal_counting", {"n": n, "m": m}))
+    for n in (100, 1000) if quick else (100, 1000, 10000):
+        for solver in ("B2", "B2-antichain", "B2-bisim"):
+            cases.append(
+                Case(solver, "random", {"n": n, "k": 2, "density": 2.0, "finals": 0.9})
+            )
+    for n in (1000, 10000) if quick else (1000, 10000, 100000):
+        for solver in ("B2", "B2-subset"):
+            cases.append(Case(solver, "random_dfa", {"n": n, "k": 2}))
+    for p, q in ((31, 37), (101, 103)) if quick else ((31, 37), (101, 103), (307, 311)):
+        cases.append(Case("B3", "counter_pair", {"p": p, "q": q, "k": 2}))
+    for n in (1000,) if quick else (1000, 10000):
+        cases.append(Case("B3", "random_pair", {"n": n, "k": 3, "density": 0.5, "eps": 0.1}))
+    for n in (100,) if quick else (100, 300):
+        cases.append(Case("B3", "dead_pair", {"n": n, "k": 2, "density": 1.5}))
+    for n in (200,) if quick else (200, 1000, 3000):
+        for solver in ("B3", "B3-epsfree", "B4", "B4-epsfree"):
+            cases.append(Case(solver, "eps_pair", {"n": n}))
+    for n in (6, 8) if quick else (8, 10, 12):
+        cases.append(Case("B4", "nth_pair", {"n": n}))
+        cases.append(Case("B4-antichain", "nth_pair", {"n": n}))
+        cases.append(Case("B4-bisim", "nth_pair", {"n": n}))
+    for n in (20,) if quick else (20, 40):
+        cases.append(Case("B4", "random_pair", {"n": n, "k": 2, "density": 0.8}))
+        cases.append(Case("B4-antichain", "random_pair", {"n": n, "k": 2, "density": 0.8}))
+    for m in (1000, 10000) if quick else (1000, 10000, 100000):
+        for solver in ("B4", "B4-subset"):
+            cases.append(Case(solver, "dfa_pair", {"n": 20, "m": m, "k": 2, "density": 1.5}))
+    return cases
+
+
+def _compile(case: Case) -> List[CompiledAutomaton]:
+    data = FAMILIES[case.family](**case.params)
+    if "A1" in data:
+        return [compile_from_dict(data["A1"]), compile_from_dict(data["A2"])]
+    return [compile_from_dict(data)]
+
+
+def run_case(case: Case, repeat: int = 3, memory: bool = True) -> Dict[str, Any]:
+    """
+    Time one case. Every repetition compiles fresh automata so that no
+    closure or subset cache survives between runs; the best time is kept.
+    Peak memory is measured in one extra run under tracemalloc.
+    """
+    solver = SOLVERS[case.solver]
+    compile_s = solve_s = float("inf")
+    stats: Dict[str, int] = {}
+    witness: Optional[str] = None
+    automata: List[CompiledAutomaton] = []
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        t0 = time.perf_counter()
+        automata = _compile(case)
+        t1 = time.perf_counter()
+        stats = {}
+        witness = solver(*automata, stats=stats)
+        t2 = time.perf_counter()
+        compile_s = min(compile_s, t1 - t0)
+        solve_s = min(solve_s, t2 - t1)
+
+    record: Dict[str, Any] = {
+        "solver": case.solver,
+        "family": case.family,
+        "params": case.params,
+        "states": [a.num_states for a in automata],
+        "transitions": [a.num_transitions for a in automata],
+        "compile_s": round(compile_s, 6),
+        "solve_s": round(solve_s, 6),
+        "peak_bytes": None,
+        "visited": stats.get("visited"),
+        "visited_backward": stats.get("visited_backward"),
+        "levels": stats.get("levels"),
+        "macro_states": stats.get("macro_states"),
+        "subsumed": stats.get("subsumed"),
+        "pruned": [stats[key] for key in ("pruned_a1", "pruned_a2") if key in stats],
+        "reduced_states": stats.get("reduced_states"),
+        "reduce_s": stats.get("reduce_s"),
+        "deterministic": stats.get("deterministic"),
+        "fast_path": stats.get("fast_path"),
+        "witness_len": None if witness is None else len(witness),
+    }
+    if memory:
+        automata = _compile(case)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            solver(*automata)
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_suite(
+    cases: Iterable[Case], repeat: int = 3, memory: bool = True
+) -> Iterator[Dict[str, Any]]:
+    meta = {"commit": _commit(), "python": platform.python_version()}
+    for case in cases:
+        record = run_case(case, repeat, memory)
+        record.update(meta)
+        yield record
+
+
+# Solve times below this are timer noise and never count as a regression.
+NOISE_FLOOR_S = 0.005
+
+
+def _key(record: Dict[str, Any]) -> str:
+    return json.dumps([record["solver"], record["family"], record["params"]], sort_keys=True)
+
+
+def compare(
+    baseline: Sequence[Dict[str, Any]],
+    records: Sequence[Dict[str, Any]],
+    threshold: float,
+    out: TextIO,
+) -> int:
+    """Print solve-time ratios against a baseline run; returns #regressions."""
+    old = {_key(r): r for r in baseline}
+    regressions = 0
+    for record in records:
+        before = old.get(_key(record))
+        if before is None or not before["solve_s"]:
+            continue
+        ratio = record["solve_s"] / before["solve_s"]
+        flag = ""
+        if ratio > threshold and record["solve_s"] >= NOISE_FLOOR_S:
+            regressions += 1
+            flag = "  REGRESSION"
+        elif record["witness_len"] != before["witness_len"]:
+            flag = "  witness length changed"
+        print(
+            f"{record['solver']:16s} {record['family']:14s} "
+            f"{json.dumps(record['params'], sort_keys=True):55s} "
+            f"{before['solve_s']:9.4f}s -> {record['solve_s']:9.4f}s  x{ratio:.2f}{flag}",
+            file=out,
+        )
+    return regressions
+
+
+def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark B1-B4 on generated automaton families "
+        "(one NDJSON record per case)."
+    )
+    parser.add_argument("--quick", action="store_true", help="Small sizes only.")
+    parser.add_argument(
+        "--solver",
+        action="append",
+        choices=sorted(SOLVERS),
+        help="Only run cases of this solver (repeatable).",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed runs per case; best is kept."
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip the extra tracemalloc run for peak memory.",
+    )
+    parser.add_argument("-o", "--output", help="Write records to file instead of stdout.")
+    parser.add_argument(
+        "--compare",
+        metavar="BASELINE",
+        help="NDJSON of an earlier run; prints time ratios to stderr and exits "
+        "with 1 if a case got slower than --threshold.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown factor counted as a regression (default 1.25).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = _parse_args(argv)
+    cases = [c for c in suite(args.quick) if not args.solver or c.solver in args.solver]
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    records: List[Dict[str, Any]] = []
+    try:
+        for record in run_suite(cases, args.repeat, not args.no_memory):
+            records.append(record)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = [json.loads(line) for line in f if line.strip()]
+        if compare(baseline, records, args.threshold, sys.stderr):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from collections import deque
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, FrozenSet
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, FrozenSet
 
 EPSILON_SYMBOL = "\u03b5"
 BOTTOM_SYMBOL = "\u22a5"
@@ -19,8 +19,7 @@ def normalize_symbol(sym: Any) -> Optional[str]:
     return str(sym)
 
 
-def parse_transitions(delta: Any) -> List[Tuple[Any, Optional[str], Any]]:
-    transitions: List[Tuple[Any, Optional[str], Any]] = []
+def iter_transitions(delta: Any) -> Iterator[Tuple[Any, Optional[str], Any]]:
     if isinstance(delta, dict):
         for p, sym_map in delta.items():
             if not isinstance(sym_map, dict):
@@ -29,28 +28,34 @@ def parse_transitions(delta: Any) -> List[Tuple[Any, Optional[str], Any]]:
                 sym_norm = normalize_symbol(sym)
                 if isinstance(targets, (list, tuple, set)):
                     for q in targets:
-                        transitions.append((p, sym_norm, q))
+                        yield (p, sym_norm, q)
                 else:
-                    transitions.append((p, sym_norm, targets))
-        return transitions
+                    yield (p, sym_norm, targets)
+        return
 
     if not isinstance(delta, (list, tuple)):
         raise ValueError("Delta must be a list/tuple or adjacency dict.")
 
     for item in delta:
-        if isinstance(item, (list, tuple)) and len(item) == 3:
-            p, a, q = item
-            transitions.append((p, normalize_symbol(a), q))
-        elif isinstance(item, dict):
-            p = item.get("from")
-            a = item.get("symbol")
-            q = item.get("to")
-            if p is None or q is None:
-                raise ValueError("Transition dict must have 'from' and 'to'.")
-            transitions.append((p, normalize_symbol(a), q))
-        else:
-            raise ValueError("Each transition must be a 3-tuple/list or a dict.")
-    return transitions
+        yield parse_transition_item(item)
+
+
+def parse_transition_item(item: Any) -> Tuple[Any, Optional[str], Any]:
+    if isinstance(item, (list, tuple)) and len(item) == 3:
+        p, a, q = item
+        return (p, normalize_symbol(a), q)
+    if isinstance(item, dict):
+        p = item.get("from")
+        a = item.get("symbol")
+        q = item.get("to")
+        if p is None or q is None:
+            raise ValueError("Transition dict must have 'from' and 'to'.")
+        return (p, normalize_symbol(a), q)
+    raise ValueError("Each transition must be a 3-tuple/list or a dict.")
+
+
+def parse_transitions(delta: Any) -> List[Tuple[Any, Optional[str], Any]]:
+    return list(iter_transitions(delta))
 
 
 def build_adj(
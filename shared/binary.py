@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Versioned binary format for compiled automata.
+
+Layout (little-endian, all integers int32 unless noted):
+
+    header   magic b"NFAB", u32 version, u32 n, u32 k, u32 |Sigma|, u32 |I|,
+             u32 #symbol edges, u32 #ε-edges, u64 length of the label blob
+    sigma    |Sigma| symbol ids
+    initials |I| state ids
+    sym_ptr  n + 1 row offsets (rows sorted by symbol id)
+    sym_dst  #symbol edges target ids
+    edge_sym #symbol edges symbol ids
+    eps_ptr  n + 1 row offsets
+    eps_dst  #ε-edges target ids
+    finals   n bytes (1 = final)
+    labels   UTF-8 JSON {"states": [...], "symbols": [...]}
+
+load_binary maps the file read-only and hands memoryviews of the sections to
+the automaton, so loading costs one label decode and worker processes that
+map the same file share its pages. JSON stays the interchange format;
+load_cached keeps a binary copy keyed by the SHA-256 of the source file.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from shared.automaton_common import read_json_input
+from shared.compiled import CompiledAutomaton, compile_from_dict
+from shared.streaming import load_automaton, load_automaton_pair
+
+MAGIC = b"NFAB"
+FORMAT_VERSION = 2
+SUFFIX = ".nfab"
+# Directory (next to the source JSON) used by load_cached unless overridden
+# by the AUTOMATON_CACHE_DIR environment variable.
+CACHE_DIRNAME = ".automaton_cache"
+
+_HEADER = struct.Struct("<4s7IQ")
+_LITTLE = sys.byteorder == "little"
+
+
+class MappedAutomaton(CompiledAutomaton):
+    """
+    CompiledAutomaton whose arrays are views into a memory-mapped file.
+
+    Pickling sends only the path, so a worker process maps the same file
+    instead of receiving a copy of the arrays.
+    """
+
+    __slots__ = ("path", "_map")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (load_binary, (self.path,))
+
+
+def _int_bytes(values: Sequence[int]) -> bytes:
+    data = array("i", values)
+    if not _LITTLE:
+        data.byteswap()
+    return data.tobytes()
+
+
+def write_binary(automaton: CompiledAutomaton, path: str) -> None:
+    """Write automaton to path in the binary format (atomically replaced)."""
+    labels = json.dumps(
+        {"states": automaton.states, "symbols": automaton.symbols},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        automaton.num_states,
+        automaton.num_symbols,
+        len(automaton.sigma),
+        len(automaton.initials),
+        len(automaton.sym_dst),
+        len(automaton.eps_dst),
+        len(labels),
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=SUFFIX, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(header)
+            for column in (
+                automaton.sigma,
+                automaton.initials,
+                automaton.sym_ptr,
+                automaton.sym_dst,
+                automaton.edge_sym,
+                automaton.eps_ptr,
+                automaton.eps_dst,
+            ):
+                out.write(_int_bytes(column))
+            out.write(bytes(automaton.finals))
+            out.write(labels)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def is_binary(path: Optional[str]) -> bool:
+    """True if path names a file that starts with the binary magic."""
+    if not path:
+        return False
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def load_binary(path: str) -> MappedAutomaton:
+    """Map a binary automaton file; raises ValueError if it is not one."""
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            raise ValueError(f"{path}: not a binary automaton file.") from None
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: not a binary automaton file.")
+    magic, version, n, k, n_sigma, n_init, n_sym, n_eps, n_labels = (
+        _HEADER.unpack_from(data)
+    )
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a binary automaton file.")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"{path}: binary format version {version}, expected {FORMAT_VERSION}."
+        )
+    lengths = (n_sigma, n_init, n + 1, n_sym, n_sym, n + 1, n_eps)
+    if len(data) != _HEADER.size + 4 * sum(lengths) + n + n_labels:
+        raise ValueError(f"{path}: truncated or corrupt binary automaton file.")
+
+    view = memoryview(data)
+    offset = _HEADER.size
+    columns: List[Sequence[int]] = []
+    for length in lengths:
+        section = view[offset : offset + 4 * length]
+        if _LITTLE:
+            columns.append(section.cast("i"))
+        else:
+            column = array("i", section.tobytes())
+            column.byteswap()
+            columns.append(column)
+        offset += 4 * length
+    finals = view[offset : offset + n]
+    offset += n
+    labels = json.loads(bytes(view[offset : offset + n_labels]).decode("utf-8"))
+
+    sigma, initials, sym_ptr, sym_dst, edge_sym, eps_ptr, eps_dst = columns
+    automaton = MappedAutomaton(
+        states=labels["states"],
+        symbols=labels["symbols"],
+        sigma=sigma,
+        initials=initials,
+        finals=finals,
+        sym_ptr=sym_ptr,
+        sym_dst=sym_dst,
+        edge_sym=edge_sym,
+        eps_ptr=eps_ptr,
+        eps_dst=eps_dst,
+    )
+    automaton.path = os.path.abspath(path)
+    automaton._map = data
+    return automaton
+
+
+def source_digest(path: str) -> str:
+    """SHA-256 of the file contents (the cache key of its binary copy)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_dir_for(path: str) -> str:
+    return os.environ.get("AUTOMATON_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME
+    )
+
+
+def _cached(
+    path: str,
+    names: Sequence[str],
+    compile_source: Callable[[str], Sequence[CompiledAutomaton]],
+    cache_dir: Optional[str],
+) -> List[CompiledAutomaton]:
+    directory = cache_dir or cache_dir_for(path)
+    key = source_digest(path)
+    targets = [os.path.join(directory, f"{key}{name}{SUFFIX}") for name in names]
+    try:
+        return [load_binary(target) for target in targets]
+    except (OSError, ValueError):
+        pass  # missing, stale or corrupt: rebuild from the JSON source
+    automata = list(compile_source(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for automaton, target in zip(automata, targets):
+            write_binary(automaton, target)
+        return [load_binary(target) for target in targets]
+    except OSError:
+        return automata  # read-only or full cache directory: stay uncached
+
+
+def load_cached(path: str, cache_dir: Optional[str] = None) -> CompiledAutomaton:
+    """
+    Load the automaton JSON at path through its binary cache entry.
+
+    The first call compiles the JSON (streaming) and writes
+    <cache_dir>/<sha256 of the file>.nfab; later calls on an unchanged
+    file only hash it and map the binary copy. If the cache directory
+    cannot be created or written, the compiled JSON is returned uncached.
+    """
+    (automaton,) = _cached(path, ("",), lambda p: (load_automaton(p),), cache_dir)
+    return automaton
+
+
+def load_cached_pair(
+    path: str, cache_dir: Optional[str] = None
+) -> Tuple[CompiledAutomaton, CompiledAutomaton]:
+    """load_cached for a {"A1": ..., "A2": ...} pair file."""
+    A1, A2 = _cached(path, ("-A1", "-A2"), load_automaton_pair, cache_dir)
+    return A1, A2
+
+
+_loaded: Dict[Tuple[str, int, int], CompiledAutomaton] = {}
+
+
+def load_file(path: str, cache: bool = False) -> CompiledAutomaton:
+    """
+    Load an automaton file referenced by path: binary files are mapped,
+    JSON files are streamed, or go through load_cached with cache=True.
+    Results are memoized per process by (path, mtime, size), so many jobs
+    naming one file share one automaton.
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    automaton = _loaded.get(key)
+    if automaton is None:
+        if is_binary(path):
+            automaton = load_binary(path)
+        elif cache:
+            automaton = load_cached(path)
+        else:
+            automaton = load_automaton(path)
+        _loaded[key] = automaton
+    return automaton
+
+
+def load_input(
+    path: Optional[str], stream: bool = False, cache: bool = False
+) -> CompiledAutomaton:
+    """
+    CLI loader for one automaton: binary files are mapped; JSON goes through
+    the binary cache (cache=True), the streaming parser (stream=True) or
+    json.load. path None means stdin (JSON only, never cached).
+    """
+    if is_binary(path):
+        return load_binary(path)
+    if cache:
+        if not path:
+            raise ValueError("--cache needs an input file.")
+        return load_cached(path)
+    if stream:
+        return load_automaton(path)
+    return compile_from_dict(read_json_input(path))
+
+
+def load_input_pair(
+    path: Optional[str],
+    a1: Optional[str] = None,
+    a2: Optional[str] = None,
+    stream: bool = False,
+    cache: bool = False,
+) -> Tuple[CompiledAutomaton, CompiledAutomaton]:
+    """CLI loader for A1/A2 from a pair file or from two separate files."""
+    if a1 or a2:
+        if not (a1 and a2):
+            raise ValueError("--a1 and --a2 must be given together.")
+        return load_input(a1, stream, cache), load_input(a2, stream, cache)
+    if cache:
+        if not path:
+            raise ValueError("--cache needs an input file.")
+        return load_cached_pair(path)
+    if stream:
+        return load_automaton_pair(path)
+    data = read_json_input(path)
+    return compile_from_dict(data["A1"]), compile_from_dict(data["A2"])
+
+
+def iter_automata(
+    source: str, key: str, stream: bool = False, cache: bool = False
+) -> Iterator[Tuple[Any, Callable[[], CompiledAutomaton]]]:
+    """
+    (id, loader) for every automaton of source: a directory (its .json and
+    binary files, sorted by name; id = file name) or an NDJSON file ('-' for
+    stdin) whose lines are automata or {"id": ..., key: automaton or path}
+    records (id = "id" or the line number). Loading is deferred to the
+    loader, so one bad entry does not stop the caller.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path) and name.endswith((".json", SUFFIX)):
+                yield name, lambda path=path: load_input(path, stream, cache)
+        return
+    lines = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        index = 0
+        for line in lines:
+            if not line.strip():
+                continue
+
+            def load(line: str = line) -> CompiledAutomaton:
+                record = json.loads(line)
+                value = record.get(key, record) if isinstance(record, dict) else record
+                if isinstance(value, str):
+                    return load_input(value, stream, cache)
+                if not isinstance(value, dict):
+                    raise ValueError(f"{key} must be an automaton object or a file path.")
+                return compile_from_dict(value)
+
+            try:
+                record_id = json.loads(line).get("id", index)
+            except (ValueError, AttributeError):
+                record_id = index
+            yield record_id, load
+            index += 1
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compile an automaton JSON file into the binary format."
+    )
+    parser.add_argument("input", help="Automaton JSON (Q, Sigma, I, F, Delta).")
+    parser.add_argument(
+        "-o", "--output", help=f"Output file (default: input with {SUFFIX})."
+    )
+    parser.add_argument(
+        "--member",
+        choices=("A1", "A2"),
+        help="Compile one automaton of a {\"A1\": ..., \"A2\": ...} pair file.",
+    )
+    args = parser.parse_args(argv)
+    output = args.output or os.path.splitext(args.input)[0] + (
+        f"-{args.member}" if args.member else ""
+    ) + SUFFIX
+    try:
+        if args.member:
+            automaton = load_automaton_pair(args.input)[args.member == "A2"]
+        else:
+            automaton = load_automaton(args.input)
+        write_binary(automaton, output)
+    except (KeyError, ValueError) as exc:
+        print(f"Input error: {exc}", file=sys.stderr)
+        return 2
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Resource budgets for the exponential searches (B2, B4).
+
+A solver given a Budget calls check() once per expanded search node. Node
+and macro-state counts are compared on every call; wall time and memory
+only every CHECK_INTERVAL calls. When a limit is hit, BudgetExceeded is
+raised: the answer is unknown, which is neither a witness nor ⊥. The
+solver adds partial statistics (visited, frontier, depth) to the exception
+and to its stats dict before it propagates.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows: memory budgets are not checked
+    resource = None  # type: ignore[assignment]
+
+# Calls to Budget.check between two wall-time/memory checks.
+CHECK_INTERVAL = 256
+
+# Exit code of the CLIs for an unknown result.
+EXIT_BUDGET = 3
+
+
+class BudgetExceeded(Exception):
+    """The search was aborted by its Budget; stats holds the partial counters."""
+
+    def __init__(self, resource_name: str, limit: float) -> None:
+        super().__init__(f"{resource_name} budget of {limit:g} exceeded")
+        self.resource = resource_name
+        self.limit = limit
+        self.stats: Dict[str, int] = {}
+
+    def add_stats(self, stats: Optional[Dict[str, int]], **partial: int) -> None:
+        """Record partial counters on the exception and in the solver's stats."""
+        self.stats.update(partial)
+        if stats is not None:
+            stats.update(partial)
+            stats["budget_exceeded"] = 1
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MiB (None if unknown)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (0 if unknown)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class Budget:
+    """
+    Limits for one search; None leaves a resource unlimited.
+
+    max_states bounds the expanded search nodes (product pairs or macro-
+    states), max_macro_states the DFA states built, max_seconds the wall
+    time since the Budget was created (or since start()) and max_memory_mb
+    the current RSS of the process (approximate; Unix only). Without
+    /proc/self/statm only the peak RSS is known; the limit then trips only
+    if the peak grew past it after start(), so an earlier job in the same
+    process cannot exhaust a later job's memory budget.
+    """
+
+    def __init__(
+        self,
+        max_states: Optional[int] = None,
+        max_macro_states: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        max_memory_mb: Optional[float] = None,
+    ) -> None:
+        self.max_states = max_states
+        self.max_macro_states = max_macro_states
+        self.max_seconds = max_seconds
+        self.max_memory_mb = max_memory_mb
+        inf = float("inf")
+        self._states = inf if max_states is None else max_states
+        self._macro_states = inf if max_macro_states is None else max_macro_states
+        self._slow = max_seconds is not None or max_memory_mb is not None
+        self._calls = 0
+        self.start()
+
+    def start(self) -> None:
+        """Restart the wall-time budget and the peak-RSS baseline."""
+        self._started = time.perf_counter()
+        self._peak_at_start = _peak_rss_mb() if self.max_memory_mb is not None else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def check(self, states: int, macro_states: int = 0) -> None:
+        """Raise BudgetExceeded if a limit is hit (states/macro_states: current counts)."""
+        if states > self._states:
+            raise BudgetExceeded("states", self._states)
+        if macro_states > self._macro_states:
+            raise BudgetExceeded("macro-states", self._macro_states)
+        if not self._slow:
+            return
+        self._calls += 1
+        if self._calls % CHECK_INTERVAL:
+            return
+        if self.max_seconds is not None and self.elapsed > self.max_seconds:
+            raise BudgetExceeded("time (s)", self.max_seconds)
+        if self.max_memory_mb is not None and self._memory_mb() > self.max_memory_mb:
+            raise BudgetExceeded("memory (MiB)", self.max_memory_mb)
+
+    def _memory_mb(self) -> float:
+        rss = _rss_mb()
+        if rss is not None:
+            return rss
+        peak = _peak_rss_mb()
+        return peak if peak > self._peak_at_start else 0.0
+
+    @classmethod
+    def from_args(cls, args: Any) -> Optional["Budget"]:
+        """Budget from the --max-* CLI options, or None if none is set."""
+        limits = (args.max_states, args.max_macro_states, args.max_seconds, args.max_memory)
+        if all(limit is None for limit in limits):
+            return None
+        return cls(*limits)
+
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Union
+
+from shared.compiled import CompiledAutomaton
+from shared.instrument import phase
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """Yield the state ids whose bits are set in mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def mask_of(states: Iterable[int]) -> int:
+    mask = 0
+    for q in states:
+        mask |= 1 << q
+    return mask
+
+
+_FLAG_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def mask_of_flags(flags: Sequence[int]) -> int:
+    """
+    Bitset of the indices whose flag is 1 (e.g. finals) in O(len(flags)):
+    mask_of shifts a whole bitset per state, which is quadratic for dense
+    sets of large state ids.
+    """
+    if not len(flags):
+        return 0
+    return int(bytes(flags[::-1]).translate(_FLAG_DIGITS), 2)
+
+
+class EpsilonClosures:
+    """
+    ε-closures of one compiled automaton, computed on demand.
+
+    The closure of a state is computed the first time it is asked for, by an
+    iterative Tarjan search over the part of the ε-graph reachable from it:
+    every SCC the search completes gets its closure at once (states of one
+    cycle share it), stored once under the SCC's representative as a
+    sorted array of state ids, or as a bitset where that is smaller (dense
+    closures, e.g. along ε-chains). States without outgoing ε-edges are
+    their own closure and are never stored. closure_mask ORs the closures
+    of a set's states into one bitset; results for recently seen sets are
+    kept in an LRU cache.
+    """
+
+    def __init__(self, automaton: CompiledAutomaton, cache_size: int = 4096) -> None:
+        self.automaton = automaton
+        self.cache_size = cache_size
+        self.has_eps = bool(len(automaton.eps_dst))
+        # rep[q]: representative of q's SCC once its closure is known, else -1.
+        self._rep: Optional[array] = None
+        # Representative -> closure as sorted state ids or bitset (only if
+        # larger than {q}).
+        self._closure: Dict[int, Union[array, int]] = {}
+        self._cache: OrderedDict[int, int] = OrderedDict()
+        # calls counts every closure_mask and state_closure call, also the
+        # ε-free shortcuts; hits + misses only the calls that went through
+        # the cache.
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+
+    def state_closure(self, q: int) -> Sequence[int]:
+        """ε-closure of state id q as sorted state ids."""
+        self.calls += 1
+        eps_ptr = self.automaton.eps_ptr
+        if eps_ptr[q] == eps_ptr[q + 1]:
+            return (q,)
+        closure = self._stored(q)
+        if closure is None:
+            return (q,)
+        return closure if isinstance(closure, array) else list(iter_bits(closure))
+
+    def _stored(self, q: int) -> Union[array, int, None]:
+        """Stored closure of q (a state with ε-edges); None if it is just {q}."""
+        rep = self._rep
+        if rep is None or rep[q] < 0:
+            with phase("closure"):
+                self._search(q)
+            rep = self._rep
+        return self._closure.get(rep[q])
+
+    def _search(self, root: int) -> None:
+        """Tarjan from root; closes every SCC not known yet (reverse topological order)."""
+        automaton = self.automaton
+        eps_ptr, eps_dst = automaton.eps_ptr, automaton.eps_dst
+        if self._rep is None:
+            self._rep = array("i", [-1]) * automaton.num_states
+        rep, closures = self._rep, self._closure
+        index: Dict[int, int] = {root: 0}
+        low: Dict[int, int] = {root: 0}
+        stack: List[int] = [root]
+        on_stack = {root}
+        # Each frame is (state, position of the next ε-edge to inspect).
+        work = [(root, eps_ptr[root])]
+        while work:
+            q, pos = work[-1]
+            if pos < eps_ptr[q + 1]:
+                work[-1] = (q, pos + 1)
+                r = eps_dst[pos]
+                if rep[r] >= 0:
+                    continue  # closed by an earlier search
+                if r not in index:
+                    index[r] = low[r] = len(index)
+                    stack.append(r)
+                    on_stack.add(r)
+                    work.append((r, eps_ptr[r]))
+                elif r in on_stack and index[r] < low[q]:
+                    low[q] = index[r]
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[q] < low[parent]:
+                    low[parent] = low[q]
+            if low[q] != index[q]:
+                continue
+            component: List[int] = []
+            while True:
+                r = stack.pop()
+                on_stack.discard(r)
+                component.append(r)
+                if r == q:
+                    break
+            members = set(component)
+            for p in component:
+                for i in range(eps_ptr[p], eps_ptr[p + 1]):
+                    r = eps_dst[i]
+                    if r not in members:
+                        # Successor SCCs were closed before this one.
+                        closure = closures.get(rep[r], (r,))
+                        if isinstance(closure, int):
+                            closure = iter_bits(closure)
+                        members.update(closure)
+            for p in component:
+                rep[p] = q
+            if len(members) > 1:
+                # 4 bytes per id against one bit per state up to the largest id.
+                if 32 * len(members) < max(members):
+                    closures[q] = array("i", sorted(members))
+                else:
+                    flags = bytearray(max(members) + 1)
+                    for p in members:
+                        flags[p] = 1
+                    closures[q] = mask_of_flags(flags)
+
+    def closure_mask(self, mask: int) -> int:
+        """ε-closure of the state set encoded by mask, as a bitset."""
+        self.calls += 1
+        if not self.has_eps:
+            return mask
+        cache = self._cache
+        closed = cache.get(mask)
+        if closed is not None:
+            self.hits += 1
+            cache.move_to_end(mask)
+            return closed
+        self.misses += 1
+        eps_ptr = self.automaton.eps_ptr
+        closed = mask
+        extra: List[int] = []
+        rest = mask
+        while rest:
+            low = rest & -rest
+            q = low.bit_length() - 1
+            if eps_ptr[q] != eps_ptr[q + 1]:
+                closure = self._stored(q)
+                if isinstance(closure, int):
+                    closed |= closure
+                elif closure is not None:
+                    extra.extend(closure)
+            rest ^= low
+        if extra:
+            flags = bytearray(max(extra) + 1)
+            for p in extra:
+                flags[p] = 1
+            closed |= mask_of_flags(flags)
+        cache[mask] = closed
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return closed
+
+    def closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        return frozenset(iter_bits(self.closure_mask(mask_of(states))))
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "closure_calls": self.calls,
+            "closure_cache_hits": self.hits,
+            "closure_cache_misses": self.misses,
+            "closure_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_closures(automaton: CompiledAutomaton) -> EpsilonClosures:
+    """Return the closure cache of automaton, building it on first use."""
+    closures = automaton.closure_cache
+    if closures is None:
+        closures = EpsilonClosures(automaton)
+        automaton.closure_cache = closures
+    return closures
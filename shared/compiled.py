@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate, chain, compress, repeat
+from operator import add, eq, le, sub
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from shared.automaton_common import normalize_symbol, parse_transition_item
+from shared.instrument import phase
+
+# Symbol id used for ε in the flat transition columns.
+EPS_ID = -1
+
+
+class CompiledAutomaton:
+    """
+    Integer-indexed (ε-)NFA.
+
+    States and symbols are interned to dense ids. Symbol transitions are stored
+    CSR-style with one row per state: the symbol edges of q are
+    sym_dst[sym_ptr[q]:sym_ptr[q + 1]], sorted by their symbol ids (kept in
+    edge_sym), so the targets of (q, a) are one run of that row, found by
+    bisection (see run). ε-edges use a separate CSR pair eps_ptr/eps_dst.
+    Labels are only needed to translate witnesses back.
+    """
+
+    __slots__ = (
+        "states",
+        "_state_ids",
+        "symbols",
+        "symbol_ids",
+        "sigma",
+        "initials",
+        "finals",
+        "sym_ptr",
+        "sym_dst",
+        "edge_sym",
+        "eps_ptr",
+        "eps_dst",
+        "closure_cache",
+        "_reverse",
+    )
+
+    def __init__(
+        self,
+        states: List[Any],
+        symbols: List[str],
+        sigma: Sequence[int],
+        initials: Sequence[int],
+        finals: Sequence[int],
+        sym_ptr: Sequence[int],
+        sym_dst: Sequence[int],
+        edge_sym: Sequence[int],
+        eps_ptr: Sequence[int],
+        eps_dst: Sequence[int],
+    ) -> None:
+        self.states = states
+        self._state_ids: Optional[Dict[Any, int]] = None
+        self.symbols = symbols
+        self.symbol_ids: Dict[str, int] = {a: i for i, a in enumerate(symbols)}
+        # Ids of the symbols declared in Sigma (B2 iterates exactly these).
+        self.sigma = sigma
+        self.initials = initials
+        # One byte per state: 1 if final.
+        self.finals = finals
+        self.sym_ptr = sym_ptr
+        self.sym_dst = sym_dst
+        self.edge_sym = edge_sym
+        self.eps_ptr = eps_ptr
+        self.eps_dst = eps_dst
+        # Lazily attached shared.closure.EpsilonClosures (see get_closures).
+        self.closure_cache: Optional[Any] = None
+        self._reverse: Optional[Tuple[array, array, array]] = None
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle only the tables and flat arrays; lookup dicts and the
+        # closure cache are rebuilt on the receiving side.
+        return (
+            CompiledAutomaton,
+            (
+                self.states,
+                self.symbols,
+                self.sigma,
+                self.initials,
+                self.finals,
+                self.sym_ptr,
+                self.sym_dst,
+                self.edge_sym,
+                self.eps_ptr,
+                self.eps_dst,
+            ),
+        )
+
+    @property
+    def state_ids(self) -> Dict[Any, int]:
+        """Label -> state id, built on first use (solvers only need ids)."""
+        if self._state_ids is None:
+            self._state_ids = {q: i for i, q in enumerate(self.states)}
+        return self._state_ids
+
+    @property
+    def num_states(self) -> int:
+        return len(self.states)
+
+    @property
+    def num_symbols(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def num_transitions(self) -> int:
+        return len(self.sym_dst) + len(self.eps_dst)
+
+    def run(self, q: int, a: int) -> Tuple[int, int]:
+        """Edge index range [lo, hi) of the symbol-a edges of q."""
+        edge_sym = self.edge_sym
+        lo, hi = self.sym_ptr[q], self.sym_ptr[q + 1]
+        lo = bisect_left(edge_sym, a, lo, hi)
+        return lo, bisect_right(edge_sym, a, lo, hi)
+
+    def successors(self, q: int, a: int) -> Sequence[int]:
+        lo, hi = self.run(q, a)
+        return self.sym_dst[lo:hi]
+
+    def eps_successors(self, q: int) -> Sequence[int]:
+        return self.eps_dst[self.eps_ptr[q] : self.eps_ptr[q + 1]]
+
+    def reverse(self) -> Tuple[array, array, array]:
+        """
+        Reverse CSR over all edges, built on first use: the predecessors of q
+        are rev_src[rev_ptr[q]:rev_ptr[q + 1]], the symbol id of each of those
+        edges is in rev_sym (EPS_ID for ε-edges).
+        """
+        if self._reverse is None:
+            n = self.num_states
+            src = array("i")
+            for ptr in (self.sym_ptr, self.eps_ptr):
+                src.extend(row_sources(ptr))
+            dst = array("i", self.sym_dst)
+            dst.extend(self.eps_dst)
+            sym = array("i", self.edge_sym)
+            sym.extend(array("i", [EPS_ID]) * len(self.eps_dst))
+            ptr, order = _counting_order(dst, n)
+            self._reverse = (
+                ptr,
+                array("i", map(src.__getitem__, order)),
+                array("i", map(sym.__getitem__, order)),
+            )
+        return self._reverse
+
+    def symbol_map(self, other: CompiledAutomaton) -> array:
+        """Translate this automaton's symbol ids into other's (-1 if missing)."""
+        return array("i", (other.symbol_ids.get(a, -1) for a in self.symbols))
+
+    def word(self, symbol_ids: Iterable[int]) -> str:
+        symbols = self.symbols
+        return "".join(symbols[a] for a in symbol_ids if a != EPS_ID)
+
+
+class AutomatonBuilder:
+    """
+    Incremental interner for states, symbols and transitions.
+
+    Transitions are collected in three flat int columns and only turned into
+    CSR arrays by build(), so no list of Python tuples is ever materialized.
+    """
+
+    def __init__(self) -> None:
+        self.states: List[Any] = []
+        self.state_ids: Dict[Any, int] = {}
+        self.symbols: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+        self.sigma: List[int] = []
+        self.initials: List[int] = []
+        self.final_ids: List[int] = []
+        # Symbol edges and ε-edges in separate flat columns.
+        self.src = array("i")
+        self.sym = array("i")
+        self.dst = array("i")
+        self.eps_src = array("i")
+        self.eps_dst = array("i")
+        # Raw (unnormalized) JSON string symbol -> symbol id, EPS_ID for ε
+        # spellings. Only str keys: true and 1 hash equal but print
+        # differently, and lists are unhashable.
+        self._raw_symbols: Dict[str, int] = {}
+
+    def state(self, label: Any) -> int:
+        sid = self.state_ids.get(label)
+        if sid is None:
+            sid = len(self.states)
+            self.state_ids[label] = sid
+            self.states.append(label)
+        return sid
+
+    def symbol(self, sym: Optional[str]) -> int:
+        if sym is None:
+            return EPS_ID
+        aid = self.symbol_ids.get(sym)
+        if aid is None:
+            aid = len(self.symbols)
+            self.symbol_ids[sym] = aid
+            self.symbols.append(sym)
+        return aid
+
+    def raw_symbol(self, raw: Any) -> int:
+        """Intern a symbol exactly as it appears in the JSON input."""
+        if type(raw) is not str:
+            return self.symbol(normalize_symbol(raw))
+        aid = self._raw_symbols.get(raw)
+        if aid is None:
+            aid = self.symbol(normalize_symbol(raw))
+            self._raw_symbols[raw] = aid
+        return aid
+
+    def add_states(self, labels: Iterable[Any]) -> None:
+        for q in labels:
+            self.state(q)
+
+    def add_alphabet(self, alphabet: Iterable[Any]) -> None:
+        seen = set(self.sigma)
+        for sym in alphabet:
+            norm = normalize_symbol(sym)
+            if norm is None:
+                continue
+            aid = self.symbol(norm)
+            if aid not in seen:
+                seen.add(aid)
+                self.sigma.append(aid)
+
+    def add_initials(self, labels: Iterable[Any]) -> None:
+        for q in labels:
+            self.initials.append(self.state(q))
+
+    def add_finals(self, labels: Iterable[Any]) -> None:
+        for q in labels:
+            self.final_ids.append(self.state(q))
+
+    def add_transition_ids(self, p: int, a: int, q: int) -> None:
+        if a == EPS_ID:
+            self.eps_src.append(p)
+            self.eps_dst.append(q)
+        else:
+            self.src.append(p)
+            self.sym.append(a)
+            self.dst.append(q)
+
+    def add_transition(self, p: Any, sym: Optional[str], q: Any) -> None:
+        self.add_transition_ids(self.state(p), self.symbol(sym), self.state(q))
+
+    def add_transition_item(self, item: Any) -> None:
+        """Add one element of a list-format Delta (triple or from/symbol/to dict)."""
+        if isinstance(item, (list, tuple)) and len(item) == 3:
+            p, a, q = item
+            self.add_transition_ids(self.state(p), self.raw_symbol(a), self.state(q))
+        else:
+            self.add_transition(*parse_transition_item(item))
+
+    def add_state_row(self, p: Any, sym_map: Any) -> None:
+        """Add the transitions of one state of an adjacency-dict Delta."""
+        if not isinstance(sym_map, dict):
+            raise ValueError("Delta dict values must be dicts of symbol -> targets.")
+        pid = self.state(p)
+        for sym, targets in sym_map.items():
+            aid = self.raw_symbol(sym)
+            if isinstance(targets, (list, tuple, set)):
+                for q in targets:
+                    self.add_transition_ids(pid, aid, self.state(q))
+            else:
+                self.add_transition_ids(pid, aid, self.state(targets))
+
+    def add_delta(self, delta: Any) -> None:
+        if isinstance(delta, dict):
+            for p, sym_map in delta.items():
+                self.add_state_row(p, sym_map)
+            return
+        if not isinstance(delta, (list, tuple)):
+            raise ValueError("Delta must be a list/tuple or adjacency dict.")
+        state_ids = self.state_ids
+        raw_symbols = self._raw_symbols
+        src_append, sym_append, dst_append = (
+            self.src.append,
+            self.sym.append,
+            self.dst.append,
+        )
+        eps_src_append, eps_dst_append = self.eps_src.append, self.eps_dst.append
+        for item in delta:
+            if type(item) is list and len(item) == 3:
+                # Inlined fast path for the common triple format.
+                p, a, q = item
+                pid = state_ids.get(p)
+                if pid is None:
+                    pid = self.state(p)
+                qid = state_ids.get(q)
+                if qid is None:
+                    qid = self.state(q)
+                aid = raw_symbols.get(a) if type(a) is str else None
+                if aid is None:
+                    aid = self.raw_symbol(a)
+                if aid == EPS_ID:
+                    eps_src_append(pid)
+                    eps_dst_append(qid)
+                else:
+                    src_append(pid)
+                    sym_append(aid)
+                    dst_append(qid)
+            else:
+                self.add_transition_item(item)
+
+    def build(self) -> CompiledAutomaton:
+        with phase("index"):
+            return self._build()
+
+    def _build(self) -> CompiledAutomaton:
+        n = len(self.states)
+        sym_ptr, sym_dst, edge_sym = _csr(self.src, self.sym, self.dst, n, len(self.symbols))
+        eps_ptr, eps_dst, _ = _csr(self.eps_src, None, self.eps_dst, n, 0)
+
+        initials = array("i", dict.fromkeys(self.initials))
+        finals = bytearray(n)
+        for q in self.final_ids:
+            finals[q] = 1
+
+        return CompiledAutomaton(
+            states=list(self.states),
+            symbols=list(self.symbols),
+            sigma=array("i", self.sigma),
+            initials=initials,
+            finals=finals,
+            sym_ptr=sym_ptr,
+            sym_dst=sym_dst,
+            edge_sym=edge_sym,
+            eps_ptr=eps_ptr,
+            eps_dst=eps_dst,
+        )
+
+
+def row_sources(ptr: Sequence[int]) -> Iterable[int]:
+    """Source state of every edge of a per-state CSR row pointer table."""
+    lengths = map(sub, ptr[1:], ptr[:-1])
+    return chain.from_iterable(map(repeat, range(len(ptr) - 1), lengths))
+
+
+def _row_pointers(keys: Sequence[int], m: int) -> array:
+    """Prefix sums of the key counts: row r of keys sorted is ptr[r]:ptr[r + 1]."""
+    counts = array("i", [0]) * (m + 1)
+    for key, count in Counter(keys).items():
+        counts[key + 1] = count
+    return array("i", accumulate(counts))
+
+
+def _counting_order(
+    keys: Sequence[int], m: int, order: Optional[Iterable[int]] = None
+) -> Tuple[array, array]:
+    """
+    Stable counting sort of edge indices by keys (ids in range(m)), visited
+    in the given order (default: index order). Returns the row pointers
+    (m + 1 entries) and the sorted indices; O(len(keys) + m), no comparisons.
+    """
+    ptr = _row_pointers(keys, m)
+    nxt = ptr[:-1]
+    out = array("i", [0]) * len(keys)
+    if order is None:
+        for i, key in enumerate(keys):
+            pos = nxt[key]
+            nxt[key] = pos + 1
+            out[pos] = i
+    else:
+        for i in order:
+            key = keys[i]
+            pos = nxt[key]
+            nxt[key] = pos + 1
+            out[pos] = i
+    return ptr, out
+
+
+def _csr(
+    src: array, sym: Optional[array], dst: array, n: int, k: int
+) -> Tuple[array, array, array]:
+    """
+    Edge columns in per-state CSR form, each row sorted by symbol id (stable,
+    so parallel edges keep their input order): an LSD counting sort, first
+    by sym (skipped without one), then by src. Input that is already in
+    that order (e.g. an adjacency-dict Delta) is kept as it is.
+    """
+    in_order = all(map(le, src[:-1], src[1:]))
+    if sym is None:
+        sym = array("i", [0]) * len(src)
+    elif in_order:
+        keys = array("q", map(add, map(k.__mul__, src), sym))
+        in_order = all(map(le, keys[:-1], keys[1:]))
+    if in_order:
+        return _row_pointers(src, n), array("i", dst), array("i", sym)
+    ptr = _row_pointers(src, n)
+    nxt = ptr[:-1]
+    row_dst = array("i", [0]) * len(src)
+    row_sym = array("i", [0]) * len(src)
+    # Second pass by src, placing the columns directly instead of an order.
+    for i in _counting_order(sym, k)[1] if k > 1 else range(len(src)):
+        q = src[i]
+        pos = nxt[q]
+        nxt[q] = pos + 1
+        row_dst[pos] = dst[i]
+        row_sym[pos] = sym[i]
+    return ptr, row_dst, row_sym
+
+
+def compile_automaton(
+    states: Iterable[Any],
+    alphabet: Iterable[Any],
+    initials: Iterable[Any],
+    finals: Iterable[Any],
+    delta: Any,
+) -> CompiledAutomaton:
+    builder = AutomatonBuilder()
+    builder.add_states(states)
+    builder.add_alphabet(alphabet)
+    builder.add_initials(initials)
+    builder.add_finals(finals)
+    builder.add_delta(delta)
+    return builder.build()
+
+
+def compile_from_dict(A: Dict[str, Any]) -> CompiledAutomaton:
+    """Compile an automaton dict with keys Q, Sigma, I, F, Delta."""
+    return compile_automaton(
+        A["Q"], A["Sigma"], A["I"], A["F"], A["Delta"]
+    )
+
+
+def is_deterministic(automaton: CompiledAutomaton) -> bool:
+    """
+    True for an ε-free automaton with at most one initial state and at most
+    one target per (state, symbol): every macro-state of its subset
+    construction is then a singleton (or empty).
+    """
+    if len(automaton.eps_dst) or len(set(automaton.initials)) > 1:
+        return False
+    edge_sym, ptr = automaton.edge_sym, automaton.sym_ptr
+    # Rows are sorted by symbol: two targets for (q, a) are adjacent edges
+    # with the same symbol that do not straddle a row boundary.
+    repeated = compress(range(1, len(edge_sym)), map(eq, edge_sym[1:], edge_sym[:-1]))
+    starts = set(ptr)
+    return all(i in starts for i in repeated)
+
+
+def post_ids(
+    automaton: CompiledAutomaton, state_set: Iterable[int], a: int
+) -> List[int]:
+    """Symbol successors of a set of state ids (without ε-closure)."""
+    sym_dst, run = automaton.sym_dst, automaton.run
+    targets: List[int] = []
+    for q in state_set:
+        lo, hi = run(q, a)
+        targets.extend(sym_dst[lo:hi])
+    return targets
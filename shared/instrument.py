@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling of solver runs (--stats of the CLIs).
+
+A Profile collects wall times of named phases and the counters the solvers
+write into their stats dict. Phases are marked with phase(name) at a few
+coarse places (index building, ε-closure tables, determinization, the
+solve call); while no Profile is active, phase() returns one shared no-op
+context manager. The hot search loops carry no hooks at all: their
+counters (visited, pred, macro_states, ...) are written once, in the
+finally clause of each solver, and only if a stats dict was passed.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional, Sequence, TextIO, Tuple
+
+_NO_PHASE = contextlib.nullcontext()
+_active: Optional["Profile"] = None
+
+
+def phase(name: str) -> ContextManager[Any]:
+    """Time the block as phase name of the active Profile (no-op without one)."""
+    if _active is None:
+        return _NO_PHASE
+    return _active.phase(name)
+
+
+class Profile:
+    """
+    Stats of one run: counters (the solver stats dict), <phase>_s wall
+    times (nested phases are also counted in their parent, repeated phases
+    add up) and, with memory=True, the tracemalloc peak as peak_bytes.
+    Use as a context manager around loading and solving.
+    """
+
+    def __init__(self, memory: bool = False) -> None:
+        self.memory = memory
+        self.counters: Dict[str, Any] = {}
+        self.times: Dict[str, float] = {}
+        self.peak_bytes: Optional[int] = None
+        self._previous: Optional[Profile] = None
+
+    def __enter__(self) -> "Profile":
+        global _active
+        self._previous, _active = _active, self
+        if self.memory:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        global _active
+        _active = self._previous
+        if self.memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - started
+
+    def add_closure_stats(self, automata: Sequence[Any]) -> None:
+        """
+        Sum the ε-closure cache counters of the automata that built one; the
+        counters are 0 if none did, so every CLI reports the same keys.
+        """
+        for key in ("closure_calls", "closure_cache_hits", "closure_cache_misses"):
+            self.counters.setdefault(key, 0)
+        for automaton in automata:
+            closures = automaton.closure_cache
+            if closures is None:
+                continue
+            for key, value in closures.stats().items():
+                if key != "closure_cache_hit_rate":
+                    self.counters[key] = self.counters.get(key, 0) + value
+        hits = self.counters.get("closure_cache_hits", 0)
+        lookups = hits + self.counters.get("closure_cache_misses", 0)
+        if lookups:
+            self.counters["closure_cache_hit_rate"] = hits / lookups
+
+    def as_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {f"{name}_s": round(t, 6) for name, t in self.times.items()}
+        result.update(self.counters)
+        if self.peak_bytes is not None:
+            result["peak_bytes"] = self.peak_bytes
+        return result
+
+
+def profile(
+    solver: Callable[..., Optional[str]],
+    *automata: Any,
+    memory: bool = False,
+    **kwargs: Any,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Run solver(*automata, stats=..., **kwargs) on compiled automata under a
+    Profile and return (witness, stats as from --stats).
+    """
+    with Profile(memory) as prof:
+        with prof.phase("solve"):
+            witness = solver(*automata, stats=prof.counters, **kwargs)
+    prof.add_closure_stats(automata)
+    return witness, prof.as_dict()
+
+
+def print_stats(stats: Dict[str, Any], out: TextIO = sys.stderr) -> None:
+    """--stats output: one JSON object on its own line."""
+    print(json.dumps(stats, sort_keys=True), file=out)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Language-preserving state reduction before a subset construction.
+
+reduce_automaton removes ε-edges, drops states with an empty language,
+merges forward-bisimilar states (partition refinement) and, optionally,
+simulation-equivalent states. The result has the same states/symbol tables
+layout as any CompiledAutomaton (symbol ids are kept), so solvers can run on
+it unchanged and witnesses stay valid for the input automaton.
+
+With simulation the direct simulation preorder of the quotient is returned
+as well; SubsetConstruction uses it to keep only simulation-maximal states
+in every macro-state, which does not change the language of the macro-state.
+"""
+from __future__ import annotations
+
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from shared.closure import get_closures, iter_bits
+from shared.compiled import CompiledAutomaton, _csr
+from shared.subset import SubsetConstruction
+from shared.trim import coreachable
+
+# Values of the reduce= parameter / --reduce option.
+REDUCTIONS = ("bisim", "sim")
+# Simulation is quadratic; above this many states (after the bisimulation
+# quotient) mode "sim" stops at bisimulation.
+SIMULATION_LIMIT = 1000
+
+
+class Reduction(NamedTuple):
+    automaton: CompiledAutomaton
+    # simulation[q]: bitset of the states r != q that simulate q (None: not computed).
+    simulation: Optional[List[int]]
+
+
+def build_automaton(
+    template: CompiledAutomaton,
+    states: List[object],
+    initials: Sequence[int],
+    finals: bytearray,
+    src: array,
+    sym: array,
+    dst: array,
+) -> CompiledAutomaton:
+    """
+    ε-free automaton over template's symbol table from flat edge columns
+    (src[i] --sym[i]--> dst[i], any order); initials may repeat.
+    """
+    n, k = len(states), template.num_symbols
+    sym_ptr, sym_dst, edge_sym = _csr(src, sym, dst, n, k)
+    return CompiledAutomaton(
+        states=states,
+        symbols=template.symbols,
+        sigma=template.sigma,
+        initials=array("i", sorted(set(initials))),
+        finals=finals,
+        sym_ptr=sym_ptr,
+        sym_dst=sym_dst,
+        edge_sym=edge_sym,
+        eps_ptr=array("i", [0]) * (n + 1),
+        eps_dst=array("i"),
+    )
+
+
+def eliminate_epsilon(automaton: CompiledAutomaton) -> CompiledAutomaton:
+    """
+    Equivalent ε-free automaton on the same states: q reads a into every
+    a-successor of its ε-closure and is final if its closure contains a
+    final state. States whose language is empty are cut off (no edges into
+    or out of them, never final or initial).
+    """
+    n = automaton.num_states
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    state_closure = get_closures(automaton).state_closure
+    finals = bytearray(n)
+    for q in range(n):
+        if automaton.finals[q] or any(automaton.finals[p] for p in state_closure(q)):
+            finals[q] = 1
+
+    src, sym, dst = array("i"), array("i"), array("i")
+    staging = _without_eps(automaton, finals)
+    live = coreachable(staging)
+    for q in range(n):
+        if not live[q]:
+            continue
+        seen = set()
+        for p in state_closure(q):
+            for i in range(sym_ptr[p], sym_ptr[p + 1]):
+                r = sym_dst[i]
+                edge = (edge_sym[i], r)
+                if live[r] and edge not in seen:
+                    seen.add(edge)
+                    src.append(q)
+                    sym.append(edge[0])
+                    dst.append(r)
+    return build_automaton(
+        automaton,
+        list(automaton.states),
+        [q for q in automaton.initials if live[q]],
+        finals,
+        src,
+        sym,
+        dst,
+    )
+
+
+def _without_eps(automaton: CompiledAutomaton, finals: bytearray) -> CompiledAutomaton:
+    """automaton with finals replaced, ε-edges kept (only used for co-reachability)."""
+    return CompiledAutomaton(
+        states=automaton.states,
+        symbols=automaton.symbols,
+        sigma=automaton.sigma,
+        initials=automaton.initials,
+        finals=finals,
+        sym_ptr=automaton.sym_ptr,
+        sym_dst=automaton.sym_dst,
+        edge_sym=automaton.edge_sym,
+        eps_ptr=automaton.eps_ptr,
+        eps_dst=automaton.eps_dst,
+    )
+
+
+def bisimulation(automaton: CompiledAutomaton) -> List[int]:
+    """
+    Coarsest forward bisimulation of an ε-free automaton by signature
+    refinement: states start in blocks by finality and are split by their
+    set of (symbol, successor block) pairs until no block splits. Returns
+    the block id of every state (blocks numbered by first state).
+    """
+    n = automaton.num_states
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    block = list(automaton.finals)
+    count = len(set(block))
+    while True:
+        ids: Dict[object, int] = {}
+        refined = [
+            ids.setdefault(
+                (
+                    block[q],
+                    frozenset(
+                        (edge_sym[i], block[sym_dst[i]])
+                        for i in range(sym_ptr[q], sym_ptr[q + 1])
+                    ),
+                ),
+                len(ids),
+            )
+            for q in range(n)
+        ]
+        block = refined
+        if len(ids) == count:
+            return block
+        count = len(ids)
+
+
+def simulation(automaton: CompiledAutomaton) -> List[int]:
+    """
+    Direct simulation preorder of an ε-free automaton: sim[q] is the bitset
+    of all r (including q) that simulate q, i.e. r is final if q is, and
+    every q -a-> q' is matched by some r -a-> r' with r' simulating q'.
+    Greatest fixpoint, refined with a worklist: only predecessors of a
+    state whose set shrank are revisited. Quadratic in the number of states.
+    """
+    n, k = automaton.num_states, automaton.num_symbols
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    finals = automaton.finals
+    # pre[a][q]: bitset of the a-predecessors of q.
+    pre: List[Dict[int, int]] = [{} for _ in range(k)]
+    out: List[int] = []
+    for p in range(n):
+        symbols = 0
+        for i in range(sym_ptr[p], sym_ptr[p + 1]):
+            a = edge_sym[i]
+            symbols |= 1 << a
+            row = pre[a]
+            q = sym_dst[i]
+            row[q] = row.get(q, 0) | (1 << p)
+        out.append(symbols)
+    # Initial relation: finality and the outgoing symbols must be covered.
+    by_out: Dict[int, int] = {}
+    for r in range(n):
+        by_out[out[r]] = by_out.get(out[r], 0) | (1 << r)
+    final_mask = sum(1 << q for q in range(n) if finals[q])
+    sim = []
+    for q in range(n):
+        covering = 0
+        for symbols, mask in by_out.items():
+            if out[q] & ~symbols == 0:
+                covering |= mask
+        sim.append(covering & final_mask if finals[q] else covering)
+
+    # pre_of[(a, q')] = (sim[q'] it was computed for, a-predecessors of it).
+    memo: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    def pre_of(a: int, target: int) -> int:
+        mask = sim[target]
+        cached = memo.get((a, target))
+        if cached is not None and cached[0] == mask:
+            return cached[1]
+        row = pre[a]
+        result = 0
+        for r in iter_bits(mask):
+            result |= row.get(r, 0)
+        memo[(a, target)] = (mask, result)
+        return result
+
+    queued = bytearray(b"\x01" * n)
+    work = deque(range(n))
+    while work:
+        q = work.popleft()
+        queued[q] = 0
+        current = sim[q]
+        for i in range(sym_ptr[q], sym_ptr[q + 1]):
+            current &= pre_of(edge_sym[i], sym_dst[i])
+        if current != sim[q]:
+            sim[q] = current
+            for a in range(k):
+                for p in iter_bits(pre[a].get(q, 0)):
+                    if not queued[p]:
+                        queued[p] = 1
+                        work.append(p)
+    return sim
+
+
+def quotient(automaton: CompiledAutomaton, block: Sequence[int]) -> CompiledAutomaton:
+    """
+    Merge the states of every block of an ε-free automaton. A block keeps
+    the label of its first state; equivalent states are all final or all
+    non-final, so the block is final if its first state is.
+    """
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    count = max(block, default=-1) + 1
+    first = [-1] * count
+    for q, b in enumerate(block):
+        if first[b] < 0:
+            first[b] = q
+    edges = set()
+    for q in first:
+        for i in range(sym_ptr[q], sym_ptr[q + 1]):
+            edges.add((block[q], edge_sym[i], block[sym_dst[i]]))
+    src, sym, dst = array("i"), array("i"), array("i")
+    for p, a, q in sorted(edges):
+        src.append(p)
+        sym.append(a)
+        dst.append(q)
+    return build_automaton(
+        automaton,
+        [automaton.states[q] for q in first],
+        [block[q] for q in automaton.initials],
+        bytearray(automaton.finals[q] for q in first),
+        src,
+        sym,
+        dst,
+    )
+
+
+def reduce_automaton(
+    automaton: CompiledAutomaton,
+    mode: str = "bisim",
+    stats: Optional[Dict[str, int]] = None,
+    simulation_limit: int = SIMULATION_LIMIT,
+) -> Reduction:
+    """
+    ε-elimination, dead-state removal and bisimulation quotient; mode "sim"
+    additionally merges simulation-equivalent states and returns the strict
+    simulation order for macro-state pruning (skipped above
+    simulation_limit states). stats receives reduce_states (before),
+    reduced_states (after), simulated (0/1) and reduce_s (seconds spent).
+    """
+    if mode not in REDUCTIONS:
+        raise ValueError(f"Unknown reduction {mode!r}; expected one of {', '.join(REDUCTIONS)}.")
+    started = time.perf_counter()
+    reduced = eliminate_epsilon(automaton)
+    reduced = quotient(reduced, bisimulation(reduced))
+    strict: Optional[List[int]] = None
+    if mode == "sim" and reduced.num_states <= simulation_limit:
+        sim = simulation(reduced)
+        # q and r are equivalent iff each simulates the other.
+        block = [-1] * reduced.num_states
+        first: List[int] = []
+        for q in range(reduced.num_states):
+            if block[q] < 0:
+                for r in iter_bits(sim[q]):
+                    if block[r] < 0 and sim[r] >> q & 1:
+                        block[r] = len(first)
+                first.append(q)
+        if len(first) < reduced.num_states:
+            reduced = quotient(reduced, block)
+            # The simulation of the quotient is the image of the original one.
+            sim = [
+                sum(1 << b for b in {block[r] for r in iter_bits(sim[q])})
+                for q in first
+            ]
+        strict = [mask & ~(1 << q) for q, mask in enumerate(sim)]
+    if stats is not None:
+        stats["reduce_states"] = automaton.num_states
+        stats["reduced_states"] = reduced.num_states
+        stats["simulated"] = int(strict is not None)
+        stats["reduce_s"] = round(time.perf_counter() - started, 6)
+    return Reduction(reduced, strict)
+
+
+def subset_construction(
+    automaton: CompiledAutomaton,
+    reduce: Optional[str] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> SubsetConstruction:
+    """SubsetConstruction over automaton, reduced first if reduce is set."""
+    if not reduce:
+        return SubsetConstruction(automaton)
+    reduced, strict = reduce_automaton(automaton, reduce, stats)
+    return SubsetConstruction(reduced, strict)
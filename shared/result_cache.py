@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from shared.compiled import CompiledAutomaton
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    witness TEXT,
+    empty INTEGER NOT NULL,
+    used REAL NOT NULL
+)
+"""
+
+
+def _canonical_lines(automaton: CompiledAutomaton) -> Iterator[str]:
+    states, symbols = automaton.states, automaton.symbols
+    labels = [json.dumps(q, ensure_ascii=False) for q in states]
+    names = [json.dumps(a, ensure_ascii=False) for a in symbols]
+    sym_ptr, sym_dst, edge_sym = automaton.sym_ptr, automaton.sym_dst, automaton.edge_sym
+    eps_ptr, eps_dst = automaton.eps_ptr, automaton.eps_dst
+    for a in automaton.sigma:
+        yield "S " + names[a]
+    for q in automaton.initials:
+        yield "I " + labels[q]
+    for q in range(automaton.num_states):
+        if automaton.finals[q]:
+            yield "F " + labels[q]
+        for i in range(sym_ptr[q], sym_ptr[q + 1]):
+            yield f"T {labels[q]} {names[edge_sym[i]]} {labels[sym_dst[i]]}"
+        for i in range(eps_ptr[q], eps_ptr[q + 1]):
+            yield f"T {labels[q]} null {labels[eps_dst[i]]}"
+
+
+def canonical_hash(automaton: CompiledAutomaton) -> str:
+    """
+    SHA-256 of the automaton as sorted sets of Sigma symbols, initial and
+    final states and transitions (labels JSON-encoded, ε as null).
+
+    Symbols and ε spellings are already normalized by the compiler, so the
+    hash does not depend on transition order, Delta format (triples vs
+    adjacency dict) or how ε was written. States that occur only in Q do
+    not influence the language and are left out; duplicates collapse.
+    """
+    digest = hashlib.sha256()
+    for line in sorted(set(_canonical_lines(automaton))):
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def result_key(op: str, automata: Sequence[CompiledAutomaton], mode: Optional[str] = None) -> str:
+    """Cache key of one solver call: op, mode and the canonical input hashes."""
+    parts = [op, mode or ""] + [canonical_hash(a) for a in automata]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of solver results.
+
+    An in-memory LRU front of memory_entries results sits on an optional
+    SQLite store (path None keeps everything in memory). The store holds at
+    most max_entries rows; when it grows beyond that, the least recently
+    used tenth is evicted. ⊥ results are cached as well. Several processes
+    may share one database file.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 100_000,
+        memory_entries: int = 1024,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, Optional[str]] = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._rows = 0
+        if path:
+            self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+            self._db.execute(_SCHEMA)
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            self._rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _remember(self, key: str, witness: Optional[str]) -> None:
+        memory = self._memory
+        memory[key] = witness
+        memory.move_to_end(key)
+        if len(memory) > self.memory_entries:
+            memory.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """(True, witness) on a hit, (False, None) on a miss."""
+        if key in self._memory:
+            self.memory_hits += 1
+            self._memory.move_to_end(key)
+            return True, self._memory[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT witness, empty FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                self._db.execute(
+                    "UPDATE results SET used = ? WHERE key = ?", (time.time(), key)
+                )
+                witness = None if row[1] else row[0]
+                self._remember(key, witness)
+                return True, witness
+        self.misses += 1
+        return False, None
+
+    def put(self, key: str, witness: Optional[str]) -> None:
+        self._remember(key, witness)
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, witness, empty, used) VALUES (?, ?, ?, ?)",
+            (key, witness, 1 if witness is None else 0, time.time()),
+        )
+        self._rows += 1
+        if self._rows > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        assert self._db is not None
+        self._rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self._rows - self.max_entries
+        if excess <= 0:
+            return
+        excess += self.max_entries // 10
+        self._db.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY used LIMIT ?)",
+            (excess,),
+        )
+        self.evicted += excess
+        self._rows = max(0, self._rows - excess)
+
+    def cached(self, key: str, compute: Callable[[], Optional[str]]) -> Tuple[Optional[str], bool]:
+        """Return (witness, hit); on a miss compute() is called and stored."""
+        hit, witness = self.get(key)
+        if hit:
+            return witness, True
+        witness = compute()
+        self.put(key, witness)
+        return witness, False
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.disk_hits
+        calls = hits + self.misses
+        return {
+            "result_cache_calls": calls,
+            "result_cache_memory_hits": self.memory_hits,
+            "result_cache_disk_hits": self.disk_hits,
+            "result_cache_misses": self.misses,
+            "result_cache_hit_rate": hits / calls if calls else 0.0,
+            "result_cache_entries": self._rows if self._db is not None else len(self._memory),
+            "result_cache_evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from array import array
+from typing import List
+
+from shared.compiled import EPS_ID, CompiledAutomaton
+
+
+class SearchTree:
+    """
+    Predecessor columns of a BFS, indexed in discovery order.
+
+    Node i was reached from node parent[i] (-1 for a root) over symbol id
+    symbol[i] (EPS_ID for an ε-step). Two flat int arrays replace a dict of
+    (prev_node, symbol) tuples keyed by the node: the search keeps only its
+    membership structure on the real nodes (macro-states, product pairs)
+    and refers to them by index everywhere else.
+    """
+
+    __slots__ = ("parent", "symbol")
+
+    def __init__(self, roots: int = 0) -> None:
+        self.parent = array("i", [-1]) * roots
+        self.symbol = array("i", [EPS_ID]) * roots
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def add(self, parent: int, symbol: int) -> int:
+        """Append a node reached from parent over symbol; returns its index."""
+        self.parent.append(parent)
+        self.symbol.append(symbol)
+        return len(self.parent) - 1
+
+    def path(self, end: int) -> List[int]:
+        """Symbol ids on the way from a root to node end."""
+        parent, symbol = self.parent, self.symbol
+        symbol_ids: List[int] = []
+        while parent[end] != -1:
+            symbol_ids.append(symbol[end])
+            end = parent[end]
+        symbol_ids.reverse()
+        return symbol_ids
+
+    def word(self, automaton: CompiledAutomaton, end: int) -> str:
+        return automaton.word(self.path(end))
+
+    def depth(self, end: int) -> int:
+        """Number of steps from a root to node end (ε-steps included)."""
+        parent = self.parent
+        depth = 0
+        while parent[end] != -1:
+            end = parent[end]
+            depth += 1
+        return depth
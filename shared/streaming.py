@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Callable, Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from shared.compiled import AutomatonBuilder, CompiledAutomaton
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class JsonStream:
+    """
+    Minimal pull parser for one JSON document read in chunks.
+
+    Objects and arrays can be walked member by member; any other value is
+    decoded with json's raw_decode once it is completely in the buffer. Only
+    the unconsumed tail of the input is kept in memory.
+    """
+
+    def __init__(self, fp: TextIO, chunk_size: int = 1 << 16) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, at_least: int = 0) -> bool:
+        if self.eof:
+            return False
+        data = self.fp.read(max(self.chunk_size, at_least))
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input)."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        found = self.peek()
+        if found != ch:
+            raise ValueError(
+                f"Invalid JSON: expected {ch!r}, found {found or 'end of input'!r}."
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                # Value is cut off at the end of the buffer: read more.
+                if self._fill(len(self.buf) - self.pos):
+                    continue
+                raise ValueError(f"Invalid JSON: {exc}") from None
+            # A number or literal ending exactly at the buffer end may continue.
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _members(self, open_ch: str, close_ch: str) -> Iterator[None]:
+        self.expect(open_ch)
+        if self.peek() == close_ch:
+            self.pos += 1
+            return
+        while True:
+            yield
+            ch = self.peek()
+            self.pos += 1
+            if ch == close_ch:
+                return
+            if ch != ",":
+                raise ValueError(
+                    f"Invalid JSON: expected ',' or {close_ch!r}, "
+                    f"found {ch or 'end of input'!r}."
+                )
+
+    def items(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller must consume each value."""
+        for _ in self._members("{", "}"):
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Invalid JSON: object keys must be strings.")
+            self.expect(":")
+            yield key
+
+    def elements(self) -> Iterator[Any]:
+        """Iterate and decode the elements of an array one at a time."""
+        for _ in self._members("[", "]"):
+            yield self.value()
+
+
+def _read_automaton(stream: JsonStream) -> CompiledAutomaton:
+    """Build an automaton from the object at the current stream position."""
+    builder = AutomatonBuilder()
+    seen: Set[str] = set()
+    list_keys: Dict[str, Callable[[Any], None]] = {
+        "Q": builder.state,
+        "I": lambda q: builder.add_initials((q,)),
+        "F": lambda q: builder.add_finals((q,)),
+    }
+    for key in stream.items():
+        seen.add(key)
+        if key in list_keys:
+            add = list_keys[key]
+            for item in stream.elements():
+                add(item)
+        elif key == "Sigma":
+            builder.add_alphabet(stream.elements())
+        elif key == "Delta":
+            if stream.peek() == "{":
+                for p in stream.items():
+                    builder.add_state_row(p, stream.value())
+            elif stream.peek() == "[":
+                for item in stream.elements():
+                    builder.add_transition_item(item)
+            else:
+                raise ValueError("Delta must be a list/tuple or adjacency dict.")
+        else:
+            stream.value()
+    for key in ("Q", "Sigma", "I", "F", "Delta"):
+        if key not in seen:
+            raise KeyError(key)
+    return builder.build()
+
+
+def _open(path: Optional[str]) -> TextIO:
+    return open(path, "r", encoding="utf-8") if path else sys.stdin
+
+
+def load_automaton(path: Optional[str]) -> CompiledAutomaton:
+    """
+    Stream one automaton JSON (Q, Sigma, I, F, Delta) from path or stdin
+    straight into a CompiledAutomaton, without materializing the document.
+    """
+    fp = _open(path)
+    try:
+        return _read_automaton(JsonStream(fp))
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+
+def load_automaton_pair(
+    path: Optional[str],
+) -> Tuple[CompiledAutomaton, CompiledAutomaton]:
+    """Stream a {"A1": ..., "A2": ...} pair file like load_automaton."""
+    fp = _open(path)
+    try:
+        stream = JsonStream(fp)
+        found: Dict[str, CompiledAutomaton] = {}
+        for key in stream.items():
+            if key in ("A1", "A2"):
+                found[key] = _read_automaton(stream)
+            else:
+                stream.value()
+        return found["A1"], found["A2"]
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+from shared.closure import get_closures, iter_bits, mask_of, mask_of_flags
+from shared.compiled import CompiledAutomaton
+
+
+class SubsetConstruction:
+    """
+    On-the-fly powerset construction with macro-states as int bitsets.
+
+    Bit q of a macro-state is set iff state id q belongs to it. The successor
+    masks of every state (one per symbol) are built from its CSR row once and
+    cached, so post(S, a) is an OR over the set bits of S followed by one
+    ε-closure.
+
+    If simulation is given (simulation[q] = bitset of the states r != q that
+    simulate q, see shared.reduction), every macro-state is cut down to its
+    simulation-maximal states, which leaves its language unchanged.
+    """
+
+    def __init__(
+        self, automaton: CompiledAutomaton, simulation: Optional[Sequence[int]] = None
+    ) -> None:
+        self.automaton = automaton
+        # Closures are computed on demand, so building the start macro-state
+        # only touches the ε-graph reachable from I.
+        self.closures = get_closures(automaton)
+        self.simulation = simulation
+        self._final_mask: Optional[int] = None
+        self._rows: Dict[int, Dict[int, int]] = {}
+        self.start = self._close(mask_of(automaton.initials))
+
+    @property
+    def final_mask(self) -> int:
+        if self._final_mask is None:
+            self._final_mask = mask_of_flags(self.automaton.finals)
+        return self._final_mask
+
+    def _close(self, mask: int) -> int:
+        mask = self.closures.closure_mask(mask)
+        simulation = self.simulation
+        if simulation is None:
+            return mask
+        # Drop q if a state still in the set simulates it; of two mutually
+        # simulating states the higher id is kept.
+        rest = mask
+        while rest:
+            low = rest & -rest
+            if simulation[low.bit_length() - 1] & mask:
+                mask ^= low
+            rest ^= low
+        return mask
+
+    def post(self, mask: int, a: int) -> int:
+        """ε-closed successor macro-state of mask under symbol id a."""
+        row = self.row
+        out = 0
+        rest = mask
+        while rest:
+            low = rest & -rest
+            out |= row(low.bit_length() - 1).get(a, 0)
+            rest ^= low
+        return self._close(out)
+
+    def row(self, q: int) -> Dict[int, int]:
+        """State -> symbol -> target-mask index entry for state id q."""
+        targets = self._rows.get(q)
+        if targets is None:
+            automaton = self.automaton
+            sym_dst, edge_sym = automaton.sym_dst, automaton.edge_sym
+            targets = {}
+            for i in range(automaton.sym_ptr[q], automaton.sym_ptr[q + 1]):
+                a = edge_sym[i]
+                targets[a] = targets.get(a, 0) | (1 << sym_dst[i])
+            self._rows[q] = targets
+        return targets
+
+    def post_all(self, mask: int) -> Dict[int, int]:
+        """
+        ε-closed successors of mask for every symbol that occurs on an
+        outgoing edge of one of its states. Missing symbols lead to ∅.
+        """
+        moves: Dict[int, int] = {}
+        rest = mask
+        while rest:
+            low = rest & -rest
+            for a, targets in self.row(low.bit_length() - 1).items():
+                moves[a] = moves.get(a, 0) | targets
+            rest ^= low
+        close = self._close
+        return {a: close(targets) for a, targets in moves.items()}
+
+    def is_accepting(self, mask: int) -> bool:
+        return bool(mask & self.final_mask)
+
+    def states_of(self, mask: int) -> FrozenSet[int]:
+        return frozenset(iter_bits(mask))
+
+
+
+# Bits of a macro-state per level of the MacroAntichain trie.
+CHUNK_BITS = 8
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _keys_within(node: Dict[int, Any], chunk: int, offset: int = 0) -> List[int]:
+    """Submasks s of chunk with offset | s a key of node (offset ∩ chunk = ∅)."""
+    if len(node) <= 1 << chunk.bit_count():
+        return [key ^ offset for key in node if (key ^ offset) & ~chunk == 0]
+    keys = []
+    sub = chunk
+    while True:
+        if sub | offset in node:
+            keys.append(sub)
+        if not sub:
+            return keys
+        sub = (sub - 1) & chunk
+
+
+class MacroAntichain:
+    """
+    ⊆-minimal macro-states (int bitsets) over num_states states.
+
+    The macro-states are kept in a trie keyed by their CHUNK_BITS-bit chunks,
+    lowest chunk first; the last level maps a chunk to the macro-state. A
+    subset of S can only sit below chunks that are subsets of S's chunks, so
+    covers(S) follows just those children (only child 0 where S has no bit)
+    instead of comparing S with every stored macro-state; the superset
+    search of insert() prunes the same way.
+
+    Before walking the trie, both searches consult a size index: per
+    popcount the number of stored macro-states and the intersection and
+    union of all that were stored with it. A stored T ⊆ S needs |T| < |S|
+    (or T = S) and contains its bucket's intersection; a strict superset
+    needs |T| > |S| and lies within its bucket's union. When no bucket
+    qualifies (the usual case while nothing is subsumed, e.g. universal_nth)
+    the trie is not touched. Evictions leave intersection and union stale,
+    which only weakens the filter.
+    """
+
+    def __init__(self, num_states: int) -> None:
+        self._levels = max(1, -(-num_states // CHUNK_BITS))
+        self._root: Dict[int, Any] = {}
+        self._size = 0
+        # popcount -> [count, intersection, union] of the stored macro-states.
+        self._sizes: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _chunks(self, mask: int) -> List[int]:
+        return [
+            (mask >> shift) & _CHUNK_MASK
+            for shift in range(0, self._levels * CHUNK_BITS, CHUNK_BITS)
+        ]
+
+    def __contains__(self, mask: int) -> bool:
+        node = self._root
+        for chunk in self._chunks(mask):
+            node = node.get(chunk)
+            if node is None:
+                return False
+        return True
+
+    def covers(self, mask: int) -> bool:
+        """True if some stored macro-state is a subset of mask."""
+        size = mask.bit_count()
+        if not any(
+            meet & ~mask == 0 for bits, (_, meet, _) in self._sizes.items() if bits < size
+        ):
+            return mask in self
+        chunks = self._chunks(mask)
+        last = self._levels - 1
+        stack = [(self._root, 0)]
+        while stack:
+            node, level = stack.pop()
+            keys = _keys_within(node, chunks[level])
+            if level == last:
+                if keys:
+                    return True
+            else:
+                stack.extend((node[key], level + 1) for key in keys)
+        return False
+
+    def _supersets(self, mask: int) -> List[int]:
+        size = mask.bit_count()
+        if not any(
+            mask & ~join == 0 for bits, (_, _, join) in self._sizes.items() if bits > size
+        ):
+            return []
+        chunks = self._chunks(mask)
+        last = self._levels - 1
+        found: List[int] = []
+        stack = [(self._root, 0)]
+        while stack:
+            node, level = stack.pop()
+            chunk = chunks[level]
+            # Keys k ⊇ chunk are chunk | s for the submasks s of its complement.
+            keys = [chunk | key for key in _keys_within(node, _CHUNK_MASK ^ chunk, chunk)]
+            if level == last:
+                found.extend(node[key] for key in keys)
+            else:
+                stack.extend((node[key], level + 1) for key in keys)
+        return found
+
+    def _remove(self, mask: int) -> None:
+        path = []
+        node = self._root
+        for chunk in self._chunks(mask):
+            path.append((node, chunk))
+            node = node[chunk]
+        for node, chunk in reversed(path):
+            del node[chunk]
+            if node:
+                break
+        bits = mask.bit_count()
+        bucket = self._sizes[bits]
+        bucket[0] -= 1
+        if not bucket[0]:
+            del self._sizes[bits]
+
+    def insert(self, mask: int) -> List[int]:
+        """Store mask (not covered); returns the strict supersets it evicts."""
+        evicted = self._supersets(mask)
+        for other in evicted:
+            self._remove(other)
+        chunks = self._chunks(mask)
+        node = self._root
+        for chunk in chunks[:-1]:
+            node = node.setdefault(chunk, {})
+        node[chunks[-1]] = mask
+        self._size += 1 - len(evicted)
+        bucket = self._sizes.get(mask.bit_count())
+        if bucket is None:
+            self._sizes[mask.bit_count()] = [1, mask, mask]
+        else:
+            bucket[0] += 1
+            bucket[1] &= mask
+            bucket[2] |= mask
+        return evicted
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Sequence
+
+from shared.compiled import CompiledAutomaton
+
+
+def _search(
+    n: int, roots: Iterable[int], ptrs: Sequence[Sequence[int]], dsts: Sequence[Sequence[int]]
+) -> bytearray:
+    """Mark every state reachable from roots over the given CSR pairs (n+1 pointers)."""
+    seen = bytearray(n)
+    queue: deque[int] = deque()
+    for q in roots:
+        if not seen[q]:
+            seen[q] = 1
+            queue.append(q)
+    pairs = list(zip(ptrs, dsts))
+    while queue:
+        p = queue.popleft()
+        for ptr, dst in pairs:
+            for i in range(ptr[p], ptr[p + 1]):
+                q = dst[i]
+                if not seen[q]:
+                    seen[q] = 1
+                    queue.append(q)
+    return seen
+
+
+def reachable(automaton: CompiledAutomaton) -> bytearray:
+    """States reachable from I (symbol and ε-edges)."""
+    return _search(
+        automaton.num_states,
+        automaton.initials,
+        (automaton.sym_ptr, automaton.eps_ptr),
+        (automaton.sym_dst, automaton.eps_dst),
+    )
+
+
+def coreachable(automaton: CompiledAutomaton) -> bytearray:
+    """States from which some final state can be reached."""
+    rev_ptr, rev_src, _ = automaton.reverse()
+    finals = automaton.finals
+    return _search(
+        automaton.num_states,
+        (q for q in range(automaton.num_states) if finals[q]),
+        (rev_ptr,),
+        (rev_src,),
+    )
+
+
+def live_states(automaton: CompiledAutomaton) -> bytearray:
+    """
+    Trim mask: 1 for states that are reachable from I and co-reachable to F.
+
+    Only these states can occur on an accepting run, so every product or
+    subset search may drop pairs with a dead component without changing
+    the set (or BFS order) of accepting nodes it finds.
+    """
+    forward = reachable(automaton)
+    backward = coreachable(automaton)
+    return bytearray(f & b for f, b in zip(forward, backward))
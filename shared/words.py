@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Lazy enumeration of accepted words in shortlex order (--words of the CLIs).
+
+iter_words yields every word of L(A) exactly once: shorter words first,
+words of equal length in lexicographic order of their symbols. Every prefix
+determines one macro-state of the ε-free automaton, so walking the tree of
+prefixes produces no duplicates and needs no visited set. The lengths are
+walked one after another, depth first; a prefix is only entered if some
+accepted word of exactly the current length extends it (live[r]: states
+with a path of exactly r symbols into a final state, one bitset per length,
+built backwards on demand). Between two words the walk therefore does at
+most length * |Sigma| steps, and it holds only the current path plus one
+bitset per length reached.
+
+B1 enumerates its input. Complements (B2, B4) are no union over NFA
+states, and B3 does not build its product automaton up front, so they go
+through iter_dfa_words instead, which walks macro-states built on the fly.
+
+Both generators deduplicate on the printed word: with multi-character
+symbol labels (e.g. "a", "b" and "ab") distinct symbol sequences can print
+the same, and only the first (shortlex) one is yielded.
+"""
+from __future__ import annotations
+
+import json
+import sys
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple
+
+from shared.budget import Budget, BudgetExceeded
+from shared.closure import iter_bits, mask_of
+from shared.compiled import CompiledAutomaton
+from shared.reduction import eliminate_epsilon
+from shared.subset import SubsetConstruction
+
+
+def _fresh_filter(symbols: Sequence[str]) -> Callable[[str], bool]:
+    """
+    fresh(word): False if word was printed before. Symbol sequences print
+    differently anyway when all labels are non-empty and equally long; only
+    otherwise are the printed words remembered.
+    """
+    lengths = {len(label) for label in symbols}
+    if len(lengths) <= 1 and 0 not in lengths:
+        return lambda word: True
+    printed: Set[str] = set()
+
+    def fresh(word: str) -> bool:
+        if word in printed:
+            return False
+        printed.add(word)
+        return True
+
+    return fresh
+
+
+def iter_words(
+    automaton: CompiledAutomaton, stats: Optional[Dict[str, int]] = None
+) -> Iterator[str]:
+    """
+    Accepted words of automaton in shortlex order, without duplicates.
+
+    The generator ends once no state is reachable in exactly L steps: after
+    ε-elimination every remaining state can reach a final state, so no word
+    of length L or more exists. For an infinite language it never ends by
+    itself. stats gets states (of the ε-free automaton), levels (lengths
+    whose walk was started) and words (words yielded), written when the
+    generator finishes or is closed.
+    """
+    free = eliminate_epsilon(automaton)
+    n, k = free.num_states, free.num_symbols
+    sym_ptr, sym_dst = free.sym_ptr, free.sym_dst
+    rev_ptr, rev_src, _ = free.reverse()
+    subsets = SubsetConstruction(free)
+    start = subsets.start
+    # Popped from the end, so the lexicographically first symbol comes last.
+    order = sorted(range(k), key=free.symbols.__getitem__, reverse=True)
+    fresh = _fresh_filter(free.symbols)
+    live: List[int] = [subsets.final_mask]
+    frontier = start
+    length = levels = words = 0
+
+    def children(mask: int, remaining: int) -> List[Tuple[int, int]]:
+        """(symbol, successor) pairs that still reach a word of the current length."""
+        moves = subsets.post_all(mask)
+        target = live[remaining - 1]
+        return [(a, moves[a]) for a in order if moves.get(a, 0) & target]
+
+    try:
+        while frontier:
+            levels += 1
+            while len(live) <= length:
+                live.append(
+                    mask_of(
+                        rev_src[i]
+                        for q in iter_bits(live[-1])
+                        for i in range(rev_ptr[q], rev_ptr[q + 1])
+                    )
+                )
+            if start & live[length]:
+                if not length:
+                    words += 1
+                    yield ""
+                else:
+                    path: List[int] = []
+                    stack = [children(start, length)]
+                    while stack:
+                        top = stack[-1]
+                        if not top:
+                            stack.pop()
+                            if path:
+                                path.pop()
+                            continue
+                        a, nxt = top.pop()
+                        path.append(a)
+                        if len(path) == length:
+                            word = free.word(path)
+                            if fresh(word):
+                                words += 1
+                                yield word
+                            path.pop()
+                        else:
+                            stack.append(children(nxt, length - len(path)))
+            frontier = mask_of(
+                sym_dst[i]
+                for q in iter_bits(frontier)
+                for i in range(sym_ptr[q], sym_ptr[q + 1])
+            )
+            length += 1
+    finally:
+        if stats is not None:
+            stats["states"] = n
+            stats["levels"] = levels
+            stats["words"] = words
+
+
+def iter_dfa_words(
+    automaton: CompiledAutomaton,
+    start: Hashable,
+    moves: Callable[[Any], Dict[int, Any]],
+    accepting: Callable[[Any], bool],
+    stats: Optional[Dict[str, int]] = None,
+    budget: Optional[Budget] = None,
+) -> Iterator[str]:
+    """
+    Shortlex words of a DFA that is built on the fly: moves(state) gives the
+    successor per symbol id of automaton (missing symbols have none),
+    accepting(state) the acceptance; states only need to be hashable. Used
+    where the condition is not a union over NFA states (complements), so no
+    backward tables exist: each length is walked depth first, and a
+    (state, remaining length) pair whose subtree yielded nothing is
+    remembered as dead and never entered again. The walk of length L sees
+    every state within L steps; once a length adds no new state, the DFA
+    is complete and the generator stops after its longest word if the
+    language is finite. The budget is checked for every DFA state
+    expanded. stats gets states (DFA states expanded), levels and words.
+    """
+    symbols = automaton.symbols
+    fresh = _fresh_filter(symbols)
+    succ: Dict[Any, List[Tuple[int, Any]]] = {}
+    seen = {start}
+    dead: Set[Tuple[Any, int]] = set()
+    length = levels = words = 0
+    complete = False
+    limit: Optional[int] = None
+
+    def children(state: Any) -> List[Tuple[int, Any]]:
+        row = succ.get(state)
+        if row is None:
+            if budget is not None:
+                budget.check(len(succ) + 1, len(succ) + 1)
+            row = sorted(moves(state).items(), key=lambda move: symbols[move[0]])
+            succ[state] = row
+        return row
+
+    try:
+        while limit is None or length <= limit:
+            levels += 1
+            known = len(seen)
+            if not length:
+                if accepting(start):
+                    words += 1
+                    yield ""
+            else:
+                path: List[int] = []
+                # Frames: [state, remaining length, row, next index, found a word].
+                stack = [[start, length, children(start), 0, False]]
+                while stack:
+                    frame = stack[-1]
+                    state, remaining, row, i, _ = frame
+                    if i == len(row):
+                        stack.pop()
+                        if frame[4]:
+                            if stack:
+                                stack[-1][4] = True
+                        else:
+                            dead.add((state, remaining))
+                        if path:
+                            path.pop()
+                        continue
+                    frame[3] = i + 1
+                    a, nxt = row[i]
+                    seen.add(nxt)
+                    if remaining == 1:
+                        if accepting(nxt):
+                            frame[4] = True
+                            path.append(a)
+                            word = automaton.word(path)
+                            if fresh(word):
+                                words += 1
+                                yield word
+                            path.pop()
+                    elif (nxt, remaining - 1) not in dead:
+                        path.append(a)
+                        stack.append([nxt, remaining - 1, children(nxt), 0, False])
+            if length and not complete and len(seen) == known:
+                complete = True
+                limit = _longest_word(start, seen, children, accepting)
+            length += 1
+    except BudgetExceeded as exc:
+        exc.add_stats(stats, states=len(succ), levels=levels, words=words)
+        raise
+    finally:
+        if stats is not None:
+            stats["states"] = len(succ)
+            stats["levels"] = levels
+            stats["words"] = words
+
+
+def _longest_word(
+    start: Any,
+    states: Set[Any],
+    children: Callable[[Any], List[Tuple[int, Any]]],
+    accepting: Callable[[Any], bool],
+) -> Optional[int]:
+    """
+    Upper bound on the word length of a complete DFA (all states known):
+    -1 if no accepting state is reachable, None if the language is infinite
+    (a cycle through states that reach an accepting state), else the
+    number of such states.
+    """
+    preds: Dict[Any, List[Any]] = {q: [] for q in states}
+    for q in states:
+        for _, r in children(q):
+            preds[r].append(q)
+    useful = {q for q in states if accepting(q)}
+    queue = deque(useful)
+    while queue:
+        q = queue.popleft()
+        for p in preds[q]:
+            if p not in useful:
+                useful.add(p)
+                queue.append(p)
+    if start not in useful:
+        return -1
+    # Kahn's algorithm on the useful part: everything is removed iff acyclic.
+    indegree = {q: 0 for q in useful}
+    for q in useful:
+        for _, r in children(q):
+            if r in useful:
+                indegree[r] += 1
+    queue = deque(q for q, d in indegree.items() if not d)
+    removed = 0
+    while queue:
+        q = queue.popleft()
+        removed += 1
+        for _, r in children(q):
+            if r in useful:
+                indegree[r] -= 1
+                if not indegree[r]:
+                    queue.append(r)
+    return None if removed < len(useful) else len(useful)
+
+
+def print_words(words: Iterable[str], limit: int, out: TextIO = sys.stdout) -> int:
+    """
+    --words output: the first limit words as NDJSON lines {"rank", "word"}
+    (rank 1 is a shortest word), each flushed as soon as it is found; no
+    word after the last one printed is computed. Returns the line count.
+    """
+    count = 0
+    for count, word in enumerate(islice(words, limit), 1):
+        print(json.dumps({"rank": count, "word": word}, ensure_ascii=False), file=out, flush=True)
+    return count